@@ -0,0 +1,109 @@
+"""
+Record-to-dict mapper for NETCONF telemetry notifications.
+
+Kept free of ADK imports and fully annotated so it can be compiled ahead of
+time with mypyc; parsing_agent falls back to this source when no compiled
+build is present. To build the extension in place:
+
+    pip install mypy
+    mypyc epon_adk/agents/_parsing_fast.py
+"""
+import functools
+import re
+from typing import Dict, List, Optional, Tuple
+
+_TAG_RE = re.compile(
+    r"<(olt-id|onu-id|rx-power|snr|ber-pre-fec|ber-post-fec"
+    r"|temperature|qot-degrade|dsp-adaptation)(?:\s[^>]*)?>([^<]*)</\1>"
+)
+_EVENT_TIME_RE = re.compile(r"<eventTime(?:\s[^>]*)?>([^<]*)</eventTime>")
+
+# tag -> key inside the "qot" section; every metric is a float
+_QOT_KEYS: Dict[str, str] = {
+    "rx-power": "rx_power_dBm",
+    "snr": "snr_dB",
+    "ber-pre-fec": "ber_pre_fec",
+    "ber-post-fec": "ber_post_fec",
+    "temperature": "temperature",
+}
+
+
+# (olt_id, onu_id, rx_power_dBm, snr_dB, ber_pre_fec, ber_post_fec,
+#  temperature, qot_degrade, dsp_adaptation)
+RecordFields = Tuple[
+    Optional[str], Optional[str],
+    Optional[float], Optional[float], Optional[float], Optional[float], Optional[float],
+    Optional[bool], Optional[str],
+]
+
+
+def _parse_single_record(raw_record: str) -> Optional[Dict[str, object]]:
+    """Helper to parse a single XML notification block."""
+    # The timestamp is split off first: it differs on every notification,
+    # while the rest of a block often repeats (heartbeats, unchanged
+    # telemetry) and can be served from the field cache.
+    timestamp: Optional[str] = None
+    body = raw_record
+    m = _EVENT_TIME_RE.search(raw_record)
+    if m is not None:
+        timestamp = m.group(1) or None
+        body = raw_record[:m.start()] + raw_record[m.end():]
+
+    fields = _parse_record_fields(body)
+    # Fresh dicts per call: callers own (and may mutate) the event
+    return {
+        "timestamp": timestamp,
+        "olt_id": fields[0],
+        "onu_id": fields[1],
+        "qot": {
+            "rx_power_dBm": fields[2],
+            "snr_dB": fields[3],
+            "ber_pre_fec": fields[4],
+            "ber_post_fec": fields[5],
+            "temperature": fields[6],
+        },
+        "status": {"qot_degrade": fields[7], "dsp_adaptation": fields[8]},
+    }
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_record_fields(body: str) -> RecordFields:
+    """Extract every field except eventTime from a notification block."""
+    qot: Dict[str, Optional[float]] = {}
+    olt_id: Optional[str] = None
+    onu_id: Optional[str] = None
+    qot_degrade: Optional[bool] = None
+    dsp_adaptation: Optional[str] = None
+
+    seen: List[str] = []
+    matches: List[Tuple[str, str]] = _TAG_RE.findall(body)
+    for tag, text in matches:
+        # Match ElementTree's find(): the first occurrence wins
+        if tag in seen:
+            continue
+        seen.append(tag)
+        if not text:
+            continue
+        qot_key = _QOT_KEYS.get(tag)
+        if qot_key is not None:
+            qot[qot_key] = float(text)
+        elif tag == "olt-id":
+            olt_id = text
+        elif tag == "onu-id":
+            onu_id = text
+        elif tag == "qot-degrade":
+            qot_degrade = text.lower() == "true"
+        elif tag == "dsp-adaptation":
+            dsp_adaptation = text
+
+    return (
+        olt_id,
+        onu_id,
+        qot.get("rx_power_dBm"),
+        qot.get("snr_dB"),
+        qot.get("ber_pre_fec"),
+        qot.get("ber_post_fec"),
+        qot.get("temperature"),
+        qot_degrade,
+        dsp_adaptation,
+    )
@@ -1,4 +1,3 @@
-import json
 import matplotlib
 matplotlib.use('Agg')  # Use non-interactive backend for thread safety
 import matplotlib.pyplot as plt
@@ -7,116 +6,386 @@ import pandas as pd
 import uuid
 import sys
 import io
+import re
+import hashlib
+import threading
 import traceback
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from google.adk.agents import LlmAgent
 
+from epon_adk.background import build_telemetry_dataframe, get_global_dataframe
+from epon_adk.utils import json_codec
+
 # Ensure charts directory exists
 CHARTS_DIR = Path(__file__).parent.parent / "web" / "static" / "charts"
 CHARTS_DIR.mkdir(parents=True, exist_ok=True)
 
+# Passing this as `data_json` analyzes the background cache's DataFrame
+# directly instead of round-tripping the history through JSON.
+CACHED_DATA_TOKEN = "__CACHED__"
+
+# (code hash, data hash) -> tool output. Re-running the same analysis over the
+# same data returns the earlier output without exec()'ing the code again.
+_RENDER_CACHE: Dict[Tuple[str, str], str] = {}
+_RENDER_CACHE_MAX = 128
+_CHART_PATH_RE = re.compile(r"/static/charts/([\w.-]+\.png)")
+
+# One long-lived figure reused by every render, so each call only clears it
+# instead of paying pyplot's figure/backend setup again. pyplot state is
+# global, so renders take turns through the lock.
+_FIG_LOCK = threading.Lock()
+_FIG = plt.figure(figsize=(10, 6))
+_FIG_SUBPLOTPARS = {
+    name: getattr(_FIG.subplotpars, name)
+    for name in ("left", "right", "bottom", "top", "wspace", "hspace")
+}
+# Restored after every render too: user code often resizes or restyles `fig`
+_FIG_SIZE = tuple(_FIG.get_size_inches())
+_FIG_DPI = _FIG.get_dpi()
+_FIG_FACECOLOR = _FIG.get_facecolor()
+_FIG_EDGECOLOR = _FIG.get_edgecolor()
+
+
+def save_chart(fig=None) -> str:
+    """
+    Save a figure (default: the current one) under CHARTS_DIR and return its
+    public path. Files are named by a hash of the PNG bytes, so identical
+    charts are written once and share a URL.
+    """
+    fig = fig or plt.gcf()
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png")
+    png = buf.getvalue()
+    filename = f"{hashlib.blake2b(png, digest_size=16).hexdigest()}.png"
+    filepath = CHARTS_DIR / filename
+    if not filepath.exists():
+        filepath.write_bytes(png)
+    return f"/static/charts/{filename}"
+
+
+@contextmanager
+def _pooled_figure():
+    """Hold the shared figure, cleared and current, for one render."""
+    global _FIG
+    with _FIG_LOCK:
+        if not plt.fignum_exists(_FIG.number):
+            # Something closed it (e.g. plt.close('all') in user code)
+            _FIG = plt.figure(figsize=(10, 6))
+        plt.figure(_FIG.number)
+        try:
+            yield _FIG
+        finally:
+            _FIG.clf()
+            _FIG.subplots_adjust(**_FIG_SUBPLOTPARS)
+            _FIG.set_dpi(_FIG_DPI)
+            _FIG.set_size_inches(_FIG_SIZE)
+            _FIG.set_facecolor(_FIG_FACECOLOR)
+            _FIG.set_edgecolor(_FIG_EDGECOLOR)
+            # Drop any extra figures the render opened itself
+            for num in plt.get_fignums():
+                if num != _FIG.number:
+                    plt.close(num)
+
+
+def _dataframe_digest(df: pd.DataFrame) -> Optional[str]:
+    """Content hash of a DataFrame, or None if it holds unhashable values."""
+    try:
+        hashed = pd.util.hash_pandas_object(df, index=True).to_numpy()
+    except TypeError:
+        return None
+    digest = hashlib.sha1(hashed.tobytes())
+    digest.update("\x00".join(map(str, df.columns)).encode())
+    return digest.hexdigest()
+
+
+def _cached_output(key: Tuple[str, str]) -> Optional[str]:
+    """Return a cached result if every chart it references still exists."""
+    output = _RENDER_CACHE.get(key)
+    if output is None:
+        return None
+    for filename in _CHART_PATH_RE.findall(output):
+        if not (CHARTS_DIR / filename).exists():
+            del _RENDER_CACHE[key]
+            return None
+    return output
+
+
+def _store_output(key: Tuple[str, str], output: str) -> None:
+    """Cache a successful result, evicting the oldest entry when full."""
+    if len(_RENDER_CACHE) >= _RENDER_CACHE_MAX:
+        _RENDER_CACHE.pop(next(iter(_RENDER_CACHE)))
+    _RENDER_CACHE[key] = output
+
+
+def _load_dataframe(data_json: str) -> pd.DataFrame:
+    """Build the analysis DataFrame from JSON or the background cache."""
+    if data_json == CACHED_DATA_TOKEN:
+        cached_df = get_global_dataframe()
+        if cached_df is None:
+            raise ValueError("no cached telemetry available.")
+        # Copy so analysis code cannot mutate the shared cache
+        return cached_df.copy()
+    # Flatten nested dictionaries into dotted columns (e.g. qot.rx_power_dBm)
+    return build_telemetry_dataframe(json_codec.loads(data_json))
+
+
+# ---------- Chart spec renderers ----------
+
+def _x_values(df: pd.DataFrame, column: str) -> pd.Series:
+    """Parse timestamp columns so time axes are spaced and sorted correctly."""
+    if column == "timestamp":
+        return pd.to_datetime(df[column], errors="coerce", utc=True)
+    return df[column]
+
+
+def _as_list(value) -> List[str]:
+    return [value] if isinstance(value, str) else list(value)
+
+
+def _groups(df: pd.DataFrame, spec: Dict[str, Any]):
+    """(group name, rows) pairs; a single unnamed group without `groupby`."""
+    if spec.get("groupby"):
+        return df.groupby(spec["groupby"], sort=True)
+    return [(None, df)]
+
+
+def _series_label(spec: Dict[str, Any], name, column: str) -> str:
+    return column if name is None else f"{spec['groupby']}={name} {column}"
+
+
+def _line(df: pd.DataFrame, spec: Dict[str, Any]) -> None:
+    for name, group in _groups(df, spec):
+        x = _x_values(group, spec["x"])
+        for y in _as_list(spec["y"]):
+            plt.plot(x, group[y], marker="o", label=_series_label(spec, name, y))
+    plt.xlabel(spec["x"])
+    plt.legend()
+
+
+def _bar(df: pd.DataFrame, spec: Dict[str, Any]) -> None:
+    values = df.groupby(spec["x"], sort=True)[_as_list(spec["y"])].agg(spec.get("agg", "mean"))
+    values.plot.bar(ax=plt.gca())
+    plt.xlabel(spec["x"])
+
+
+def _hist(df: pd.DataFrame, spec: Dict[str, Any]) -> None:
+    for name, group in _groups(df, spec):
+        for y in _as_list(spec["y"]):
+            plt.hist(group[y].dropna(), bins=spec.get("bins", 10), alpha=0.6,
+                     label=_series_label(spec, name, y))
+    plt.xlabel(", ".join(_as_list(spec["y"])))
+    plt.legend()
+
+
+def _heatmap(df: pd.DataFrame, spec: Dict[str, Any]) -> None:
+    table = df.pivot_table(
+        index=spec["y"], columns=spec["x"], values=spec["value"],
+        aggfunc=spec.get("agg", "mean"),
+    )
+    sns.heatmap(table, annot=True, fmt=".3g", cmap="viridis")
+
+
+# kind -> (renderer, required keys, optional keys)
+_CHART_RENDERERS = {
+    "line": (_line, {"x", "y"}, {"groupby"}),
+    "bar": (_bar, {"x", "y"}, {"agg"}),
+    "hist": (_hist, {"y"}, {"groupby", "bins"}),
+    "heatmap": (_heatmap, {"x", "y", "value"}, {"agg"}),
+}
+_COLUMN_KEYS = ("x", "y", "groupby", "value")
+_AGGREGATIONS = {"mean", "min", "max", "median", "sum", "count", "last"}
+
+
+def _validate_chart_spec(spec: Dict[str, Any], df: pd.DataFrame) -> Optional[str]:
+    """Return an error message for an invalid spec, or None if it is usable."""
+    kind = spec.get("kind")
+    if kind not in _CHART_RENDERERS:
+        return f"Unknown chart kind {kind!r}. Use one of: {', '.join(_CHART_RENDERERS)}."
+    _, required, optional = _CHART_RENDERERS[kind]
+    missing = required - spec.keys()
+    if missing:
+        return f"Chart kind {kind!r} requires: {', '.join(sorted(missing))}."
+    unknown = spec.keys() - required - optional - {"kind", "title"}
+    if unknown:
+        return f"Unsupported spec keys for {kind!r}: {', '.join(sorted(unknown))}."
+    for key in _COLUMN_KEYS:
+        if key not in spec:
+            continue
+        for column in _as_list(spec[key]):
+            if column not in df.columns:
+                return (
+                    f"Column {column!r} (from {key!r}) not found. "
+                    f"Available columns: {', '.join(map(str, df.columns))}."
+                )
+    if spec.get("agg", "mean") not in _AGGREGATIONS:
+        return f"Unsupported agg {spec['agg']!r}. Use one of: {', '.join(sorted(_AGGREGATIONS))}."
+    return None
+
+
+def render_chart(spec: Dict[str, Any], df: pd.DataFrame) -> str:
+    """
+    Render a chart spec with one of the pre-written renderers and return the
+    public chart path, or an error message if the spec is invalid.
+    """
+    error = _validate_chart_spec(spec, df)
+    if error:
+        return f"Invalid chart spec: {error}"
+
+    df_digest = _dataframe_digest(df)
+    cache_key = None
+    if df_digest is not None:
+        spec_key = "spec:" + json_codec.dumps(dict(sorted(spec.items())))
+        cache_key = (spec_key, df_digest)
+        cached = _cached_output(cache_key)
+        if cached is not None:
+            return cached
+
+    renderer = _CHART_RENDERERS[spec["kind"]][0]
+    with _pooled_figure() as fig:
+        fig.add_subplot(111)
+        renderer(df, spec)
+        if spec.get("title"):
+            plt.title(spec["title"])
+        fig.autofmt_xdate()
+        fig.tight_layout()
+        chart_path = save_chart(fig)
+
+    if cache_key is not None:
+        _store_output(cache_key, chart_path)
+    return chart_path
+
+
+def create_chart(spec_json: str, data_json: str) -> str:
+    """
+    Draws a chart of the telemetry data from a declarative chart spec.
+
+    Args:
+        spec_json: JSON object describing the chart, e.g.
+                   {"kind": "line", "x": "timestamp", "y": "qot.rx_power_dBm",
+                    "groupby": "onu_id", "title": "Rx power"}.
+                   kind is one of line, bar, hist, heatmap.
+        data_json: The telemetry data as a JSON string, or "__CACHED__" to use
+                   the background telemetry cache.
+
+    Returns:
+        The public chart path (/static/charts/<file>.png), or an error message.
+    """
+    try:
+        spec = json_codec.loads(spec_json)
+        if not isinstance(spec, dict):
+            return "Invalid chart spec: expected a JSON object."
+        df = _load_dataframe(data_json)
+    except Exception as e:
+        return f"Data preparation failed: {str(e)}"
+
+    try:
+        return render_chart(spec, df)
+    except Exception as e:
+        return f"Chart rendering failed: {str(e)}"
+
+
 def execute_python_analysis(code: str, data_json: str) -> str:
     """
     Executes Python code to analyze or visualize the provided telemetry data.
     
     The code has access to a pandas DataFrame named `df` containing the data.
-    The code should save any plots to the directory `CHARTS_DIR` (available in context).
+    Plots should be drawn on the provided `ax` (of figure `fig`) rather than
+    a new plt.figure(), and saved with `save_chart()`, which writes them to
+    `CHARTS_DIR` and returns the public path.
     
     Args:
         code: The Python code to execute.
-        data_json: The telemetry data as a JSON string.
+        data_json: The telemetry data as a JSON string, or "__CACHED__" to use
+                   the background telemetry cache.
         
     Returns:
         String containing stdout, stderr, and any generated file paths.
     """
     # 1. Prepare Data
     try:
-        data = json.loads(data_json)
-        # Flatten if needed (handle grouped by ONU)
-        if isinstance(data, dict):
-            flat_data = []
-            for key, items in data.items():
-                if isinstance(items, list):
-                    flat_data.extend(items)
-            data = flat_data
-            
-        # Flatten nested dictionaries for DataFrame
-        flat_rows = []
-        for item in data:
-            row = {}
-            def flatten(x, name=''):
-                if type(x) is dict:
-                    for a in x:
-                        flatten(x[a], name + a + '.')
-                else:
-                    row[name[:-1]] = x
-            flatten(item)
-            flat_rows.append(row)
-            
-        df = pd.DataFrame(flat_rows)
-        
+        df = _load_dataframe(data_json)
     except Exception as e:
         return f"Data preparation failed: {str(e)}"
 
-    # 2. Prepare Execution Context
-    # Redirect stdout to capture print statements
-    old_stdout = sys.stdout
-    redirected_output = io.StringIO()
-    sys.stdout = redirected_output
-    
-    # Define the local scope for the code
-    local_scope = {
-        "df": df,
-        "pd": pd,
-        "plt": plt,
-        "sns": sns,
-        "CHARTS_DIR": CHARTS_DIR,
-        "uuid": uuid,
-    }
-    
-    # 3. Execute Code
-    try:
-        exec(code, {}, local_scope)
-        output = redirected_output.getvalue()
-        return f"Execution Successful.\nOutput:\n{output}"
-    except Exception as e:
-        return f"Execution Failed:\n{traceback.format_exc()}"
-    finally:
-        sys.stdout = old_stdout
-        plt.close('all') # Cleanup figures
+    df_digest = _dataframe_digest(df)
+    cache_key = None
+    if df_digest is not None:
+        cache_key = (hashlib.sha1(code.encode()).hexdigest(), df_digest)
+        cached = _cached_output(cache_key)
+        if cached is not None:
+            return cached
+
+    with _pooled_figure() as fig:
+        # 2. Prepare Execution Context
+        # Redirect stdout to capture print statements
+        old_stdout = sys.stdout
+        redirected_output = io.StringIO()
+        sys.stdout = redirected_output
+
+        # Define the local scope for the code
+        local_scope = {
+            "df": df,
+            "pd": pd,
+            "plt": plt,
+            "sns": sns,
+            "fig": fig,
+            "ax": fig.add_subplot(111),
+            "CHARTS_DIR": CHARTS_DIR,
+            "uuid": uuid,
+            "save_chart": save_chart,
+        }
+
+        # 3. Execute Code
+        try:
+            exec(code, {}, local_scope)
+            output = redirected_output.getvalue()
+            result = f"Execution Successful.\nOutput:\n{output}"
+            if cache_key is not None:
+                _store_output(cache_key, result)
+            return result
+        except Exception as e:
+            return f"Execution Failed:\n{traceback.format_exc()}"
+        finally:
+            sys.stdout = old_stdout
 
 
 data_analysis_agent = LlmAgent(
     name="data_analysis_agent",
     model="gemini-2.5-flash",
-    description="Performs dynamic data analysis and visualization using Python code execution.",
+    description="Performs data analysis with Python code execution and draws charts from declarative chart specs.",
     instruction=(
     "You are the Data Analysis Agent with Code Execution capabilities.\n"
     "Your goal is to analyze EPON telemetry data or create visualizations.\n\n"
 
-    "You have access to a tool `execute_python_analysis` which runs Python code.\n"
-    "The code environment has a pandas DataFrame `df` pre-loaded with the data.\n"
-    "Available libraries: `pandas` (pd), `matplotlib.pyplot` (plt), `seaborn` (sns).\n"
-    "A Path object named CHARTS_DIR is available for saving charts.\n\n"
-
-    "IMPORTANT RULES WHEN CREATING CHARTS (MUST FOLLOW EXACTLY):\n"
-    "1. Always begin a new plot with plt.figure().\n"
-    "2. Always generate a filename using:\n"
-    "       filename = f\"{uuid.uuid4()}.png\"\n"
-    "3. Always construct the full file path using EXACTLY:\n"
-    "       filepath = CHARTS_DIR / filename\n"
-    "4. Always save the chart using EXACTLY:\n"
-    "       plt.savefig(filepath)\n"
-    "5. NEVER use plt.savefig(\"something.png\"). NEVER save to the working directory.\n"
-    "6. NEVER create paths manually. Always use CHARTS_DIR / filename.\n"
-    "7. After saving, print ONLY the public static path:\n"
-    "       /static/charts/<filename>\n\n"
-
-    "When performing analysis without charts, simply print text output.\n"
+    "You have two tools:\n"
+    "- `create_chart(spec_json, data_json)` draws charts from a JSON spec.\n"
+    "- `execute_python_analysis(code, data_json)` runs Python code for text analysis.\n"
+    "If you are asked to analyze the cached telemetry (or no data is given), "
+    "pass data_json=\"__CACHED__\" to load the cached history directly.\n\n"
+
+    "DataFrame columns are flattened with dots, e.g. timestamp, olt_id, onu_id,\n"
+    "qot.rx_power_dBm, qot.snr_dB, qot.ber_pre_fec, qot.ber_post_fec,\n"
+    "qot.temperature, status.qot_degrade, status.dsp_adaptation.\n\n"
+
+    "RULES FOR CHARTS (MUST FOLLOW EXACTLY):\n"
+    "1. ALWAYS use `create_chart` for charts. NEVER draw charts with execute_python_analysis.\n"
+    "2. spec_json is a JSON object with a `kind` and column names:\n"
+    "   - line:    {\"kind\": \"line\", \"x\": \"timestamp\", \"y\": \"qot.rx_power_dBm\", \"groupby\": \"onu_id\"}\n"
+    "   - bar:     {\"kind\": \"bar\", \"x\": \"onu_id\", \"y\": \"qot.snr_dB\", \"agg\": \"mean\"}\n"
+    "   - hist:    {\"kind\": \"hist\", \"y\": \"qot.temperature\", \"bins\": 10}\n"
+    "   - heatmap: {\"kind\": \"heatmap\", \"x\": \"timestamp\", \"y\": \"onu_id\", \"value\": \"qot.rx_power_dBm\"}\n"
+    "   `y` may be a list of columns for line, bar and hist. Add an optional \"title\".\n"
+    "3. The tool returns the public path, e.g. /static/charts/<filename>.png.\n"
+    "   If it returns an error, fix the spec and try again.\n\n"
+
+    "For analysis without charts, use `execute_python_analysis`. The code has a\n"
+    "pandas DataFrame `df` pre-loaded and `pd` available; print text output.\n"
+    "If code must plot, use the provided `ax` object instead of plt.figure().\n"
     "Return the result (text or chart path) to the user."
     ),
-    tools=[execute_python_analysis],
+    tools=[create_chart, execute_python_analysis],
     output_key="visualization_path"
 )
 
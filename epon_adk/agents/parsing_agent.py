@@ -1,9 +1,41 @@
-from typing import Dict, Any, List
+from collections import defaultdict, deque
+from typing import Dict, Any, List, Iterator
+import io
 import re
-import xml.etree.ElementTree as ET
+
+from lxml import etree
 
 from google.adk.agents import LlmAgent
 
+# Typed record mapper; picks up the mypyc-compiled build when one exists
+from ._parsing_fast import _parse_single_record
+
+# One notification block; its leaves are extracted by _parsing_fast.
+_NOTIFICATION_RE = re.compile(r"<notification\b.*?</notification>", re.DOTALL)
+# A namespace-prefixed tag (<t:onu-id>, </nc:notification>); the fast path
+# only matches unprefixed tags
+_PREFIXED_TAG_RE = re.compile(r"</?[\w.-]+:")
+
+
+def _to_bool(t): return t.lower() == "true"
+
+
+# (path, section, key, cast) for the lxml path; section None means a
+# top-level event field. `{*}` matches the element in any namespace.
+_LXML_FIELDS = (
+    ("{*}eventTime", None, "timestamp", None),
+    (".//{*}olt-id", None, "olt_id", None),
+    (".//{*}onu-id", None, "onu_id", None),
+    (".//{*}rx-power", "qot", "rx_power_dBm", float),
+    (".//{*}snr", "qot", "snr_dB", float),
+    (".//{*}ber-pre-fec", "qot", "ber_pre_fec", float),
+    (".//{*}ber-post-fec", "qot", "ber_post_fec", float),
+    (".//{*}temperature", "qot", "temperature", float),
+    (".//{*}qot-degrade", "status", "qot_degrade", _to_bool),
+    (".//{*}dsp-adaptation", "status", "dsp_adaptation", None),
+)
+
+
 # ---------- Tool: Parse NETCONF / XML-ish raw record ----------
 
 def parse_telemetry_log(raw_log: str) -> Dict[str, List[Dict[str, Any]]]:
@@ -19,106 +51,75 @@ def parse_telemetry_log(raw_log: str) -> Dict[str, List[Dict[str, Any]]]:
         Values are lists of parsed event dicts, sorted by timestamp (newest last).
         Only the last 5 events per ONU are retained.
     """
-    # Split raw log into individual notification blocks
-    # Simple heuristic: split by </notification>
-    blocks = raw_log.split("</notification>")
-    
-    parsed_events = []
-    
-    for block in blocks:
-        if "<notification" not in block:
-            continue
-            
-        # Re-add the closing tag for XML parsing
-        full_block = block + "</notification>"
-        
-        # Clean up leading whitespace/newlines
-        start_idx = full_block.find("<notification")
-        if start_idx == -1:
-            continue
-        clean_block = full_block[start_idx:]
-        
-        # Parse single record (reuse logic)
-        event = _parse_single_record(clean_block)
+    # Plain leaf-only notifications are extracted with one regex sweep per
+    # block; CDATA sections, entity references or prefixed tags need a real
+    # XML parser.
+    if "<![CDATA[" in raw_log or "&" in raw_log or _PREFIXED_TAG_RE.search(raw_log):
+        records = _iter_records_lxml(raw_log)
+    else:
+        records = (
+            _parse_single_record(m.group(0))
+            for m in _NOTIFICATION_RE.finditer(raw_log)
+        )
+
+    # Keep last 5 per ONU while parsing; log order is chronological, so the
+    # bounded deque drops older events as newer ones arrive
+    grouped: Dict[str, deque] = defaultdict(lambda: deque(maxlen=5))
+    for event in records:
         if event and event.get("onu_id"):
-            parsed_events.append(event)
-
-    # Group by ONU ID
-    grouped = {}
-    for event in parsed_events:
-        oid = str(event["onu_id"])
-        if oid not in grouped:
-            grouped[oid] = []
-        grouped[oid].append(event)
-        
-    # Keep last 5 per ONU
-    final_result = {}
-    for oid, events in grouped.items():
-        # Sort by timestamp if available, otherwise assume log order (which is usually chronological)
-        # We'll just take the last 5 from the list since we parsed in order
-        final_result[oid] = events[-5:]
-        
-    return final_result
-
-
-def _parse_single_record(raw_record: str) -> Dict[str, Any] | None:
-    """Helper to parse a single XML notification block."""
+            grouped[str(event["onu_id"])].append(event)
+
+    return {oid: list(events) for oid, events in grouped.items()}
+
+
+def _iter_records_lxml(raw_log: str) -> Iterator[Dict[str, Any]]:
+    """Stream notifications through lxml, yielding one event dict each."""
+    # The log is a sequence of sibling <notification> documents, so wrap it in
+    # a synthetic root. `{*}` matches the notification in any namespace.
+    source = io.BytesIO(b"<log>" + raw_log.encode("utf-8") + b"</log>")
+    try:
+        for _, elem in etree.iterparse(
+            source, events=("end",), tag="{*}notification", recover=True
+        ):
+            yield _parse_single_record_lxml(elem)
+
+            # Free the processed notification and any earlier siblings
+            elem.clear()
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+    except etree.XMLSyntaxError:
+        # Keep whatever was parsed before the log became unreadable
+        return
+
+
+def _parse_single_record_lxml(root) -> Dict[str, Any]:
+    """Extract an event dict from a parsed <notification> element."""
     result: Dict[str, Any] = {
         "timestamp": None,
         "olt_id": None,
         "onu_id": None,
-        "qot": {},
-        "status": {}
+        "qot": {
+            "rx_power_dBm": None,
+            "snr_dB": None,
+            "ber_pre_fec": None,
+            "ber_post_fec": None,
+            "temperature": None,
+        },
+        "status": {"qot_degrade": None, "dsp_adaptation": None},
     }
 
-    try:
-        root = ET.fromstring(raw_record)
-        # Remove namespaces
-        for elem in root.iter():
-            if "}" in elem.tag:
-                elem.tag = elem.tag.split("}", 1)[1]
-
-        # Timestamp
-        event_time_elem = root.find(".//eventTime")
-        if event_time_elem:
-            result["timestamp"] = event_time_elem.text
-
-        # IDs
-        olt_elem = root.find(".//olt-id")
-        onu_elem = root.find(".//onu-id")
-        if olt_elem is not None: result["olt_id"] = olt_elem.text
-        if onu_elem is not None: result["onu_id"] = str(onu_elem.text)
-
-        # Metrics
-        def _to_float(t): return float(t) if t else None
-        
-        rx = root.find(".//rx-power")
-        snr = root.find(".//snr")
-        ber_pre = root.find(".//ber-pre-fec")
-        ber_post = root.find(".//ber-post-fec")
-        temp = root.find(".//temperature")
-        
-        result["qot"] = {
-            "rx_power_dBm": _to_float(rx.text if rx is not None else None),
-            "snr_dB": _to_float(snr.text if snr is not None else None),
-            "ber_pre_fec": _to_float(ber_pre.text if ber_pre is not None else None),
-            "ber_post_fec": _to_float(ber_post.text if ber_post is not None else None),
-            "temperature": _to_float(temp.text if temp is not None else None),
-        }
-
-        # Status
-        qot_deg = root.find(".//qot-degrade")
-        dsp = root.find(".//dsp-adaptation")
-        
-        result["status"] = {
-            "qot_degrade": (qot_deg.text.lower() == 'true') if qot_deg is not None and qot_deg.text else None,
-            "dsp_adaptation": dsp.text if dsp is not None else None
-        }
-        
-        return result
-
-    except ET.ParseError:
-        return None
+    for path, section, key, cast in _LXML_FIELDS:
+        elem = root.find(path)
+        # lxml element text is already a str (or None when empty)
+        if elem is None or not elem.text:
+            continue
+        value = cast(elem.text) if cast else elem.text
+        if section is None:
+            result[key] = value
+        else:
+            result[section][key] = value
+
+    return result
 
 
 parsing_agent = LlmAgent(
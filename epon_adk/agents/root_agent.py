@@ -19,19 +19,42 @@ def get_cached_telemetry_data(tool_context: ToolContext) -> str:
     2. Session-specific cache (updated during this session)
     
     Returns:
-        JSON string of cached parsed data if available, or message indicating no cache.
+        For the background cache, a compact summary (record count, ONU list,
+        timestamp range and the latest record per ONU); the full history stays
+        server-side for the data analysis agent. For the session cache, the
+        cached JSON string. Otherwise a message indicating no cache.
     """
-    import json
-    from epon_adk.background import get_global_cache, get_cache_age_seconds
+    from epon_adk.utils import json_codec
+    from epon_adk.background import (
+        get_global_cache,
+        get_global_dataframe,
+        get_cache_age_seconds,
+    )
     
     # First, try global background cache
     global_cache = get_global_cache()
     if global_cache:
         cache_age = get_cache_age_seconds()
+        df = get_global_dataframe()
+        summary = {
+            "record_count": sum(len(v) for v in global_cache.values()),
+            "onu_ids": sorted(global_cache, key=lambda k: (len(k), k)),
+            "latest": {
+                onu_id: records[-1]
+                for onu_id, records in global_cache.items()
+                if records
+            },
+        }
+        if df is not None and "timestamp" in df:
+            timestamps = df["timestamp"].dropna()
+            if not timestamps.empty:
+                summary["time_range"] = [timestamps.min(), timestamps.max()]
         return (
             f"Cached data available from background worker "
-            f"(age: {cache_age:.0f}s, use this instead of re-fetching):\n"
-            f"{json.dumps(global_cache)}"
+            f"(age: {cache_age:.0f}s, use this instead of re-fetching). "
+            f"Only the latest record per ONU is shown; for history/trends ask "
+            f"data_analysis_agent to use data_json=\"__CACHED__\":\n"
+            f"{json_codec.dumps(summary)}"
         )
     
     # Second, try session-specific cache
@@ -101,6 +124,7 @@ root_agent = LlmAgent(
         "═══════════════════════════════\n"
         "IF you received 'Cached data available':\n"
         "  → The JSON is ALREADY PARSED\n"
+        "  → Background cache: 'latest' already holds the LATEST record per ONU\n"
         "  → SKIP fetching (DO NOT call get_netconf_telemetry)\n"
         "  → SKIP parsing (DO NOT call parsing_agent)\n"
         "  → GO DIRECTLY to Step 3\n\n"
@@ -114,15 +138,24 @@ root_agent = LlmAgent(
         
         "STEP 3: EXTRACT LATEST DATA\n"
         "═══════════════════════════════\n"
-        "⚠️ CRITICAL: The cached JSON contains HISTORICAL data (up to 5 records per ONU).\n"
+        "⚠️ CRITICAL: The two cache sources have DIFFERENT shapes.\n"
+        "Background cache ('Cached data available from background worker'):\n"
+        "  → A SUMMARY: record_count, onu_ids, time_range and 'latest'\n"
+        "  → 'latest' maps each ONU id to its ONE most recent record\n"
+        "  → The historical records are NOT included in the summary\n"
+        "Session cache ('Cached data available from session'):\n"
+        "  → HISTORICAL data: an array of records per ONU (up to 5)\n\n"
+        
         "For CURRENT STATUS checks:\n"
-        "  → Extract ONLY the LAST record from each ONU's array\n"
-        "  → Example: If ONU '2' has [rec1, rec2, rec3, rec4, rec5]\n"
-        "             USE ONLY rec5 (the latest/most recent)\n"
+        "  → Background cache: use latest[onu_id] (e.g. latest['2'])\n"
+        "  → Session cache: extract ONLY the LAST record from each ONU's array\n"
+        "    (if ONU '2' has [rec1, rec2, rec3, rec4, rec5], USE ONLY rec5)\n"
         "  → This represents the CURRENT state, not historical issues\n\n"
         
         "For HISTORICAL ANALYSIS (trends, charts):\n"
-        "  → Use ALL records from the array\n"
+        "  → Background cache: tell data_analysis_agent to use "
+        "data_json=\"__CACHED__\" (it loads the full history server-side)\n"
+        "  → Session cache: use ALL records from the ONU's array\n"
         "  → Only when user explicitly asks for history/trends\n\n"
         
         "STEP 4: ANALYSIS\n"
@@ -171,25 +204,27 @@ root_agent = LlmAgent(
         "- ❌❌❌ DO NOT RETURN compliance_analysis DIRECTLY ❌❌❌\\n"
         "- DO NOT skip checking cache first\\n"
         "- DO NOT analyze historical data for current status\\n"
-        "- DO NOT send all 5 records to compliance_agent\\n\\n"
+        "- DO NOT send historical records to compliance_agent\\n\\n"
 
         
         "EXAMPLE CORRECT FLOW:\n"
         "User asks: 'What is ONU 2 status?'\n"
         "1. ✓ Call get_cached_telemetry_data()\n"
-        "2. ✓ See cached JSON: {'2': [rec1, rec2, rec3, rec4, rec5]}\n"
-        "3. ✓ Extract ONLY rec5 (latest) from ONU '2'\n"
-        "4. ✓ Call compliance_agent with rec5 only\n"
+        "2. ✓ See background summary: {'onu_ids': ['1', '2'], 'latest': {'2': rec, ...}}\n"
+        "3. ✓ Take latest['2'] (the current record for ONU '2')\n"
+        "4. ✓ Call compliance_agent with latest['2'] only\n"
         "5. ✓ Call reflection_agent\n"
-        "6. ✓ Return answer based on CURRENT state (rec5)\n\n"
+        "6. ✓ Return answer based on CURRENT state (latest['2'])\n"
+        "(Session cache instead: {'2': [rec1, ..., rec5]} → use rec5 only)\n\n"
         
         "EXAMPLE HISTORICAL QUERY:\n"
         "User asks: 'Show me ONU 2 trend over time'\n"
         "1. ✓ Call get_cached_telemetry_data()\n"
-        "2. ✓ See cached JSON: {'2': [rec1, rec2, rec3, rec4, rec5]}\n"
-        "3. ✓ Use ALL 5 records for trend analysis\n"
-        "4. ✓ Call data_analysis_agent with all 5 records\n"
-        "5. ✓ Return chart showing trend\n"
+        "2. ✓ See background summary (history is not in it)\n"
+        "3. ✓ Call data_analysis_agent with data_json=\"__CACHED__\" "
+        "and ask for ONU '2' over time\n"
+        "4. ✓ Return chart showing trend\n"
+        "(Session cache instead: {'2': [rec1, ..., rec5]} → pass all 5 records)\n"
     ),
     tools=[
         get_cached_telemetry_data,
@@ -3,13 +3,21 @@
 from .telemetry_cache_worker import (
     start_background_worker,
     get_global_cache,
+    get_global_dataframe,
+    build_telemetry_dataframe,
     get_cache_age_seconds,
     update_cache,
+    refresh_cache,
+    cache_worker_task,
 )
 
 __all__ = [
     "start_background_worker",
     "get_global_cache",
+    "get_global_dataframe",
+    "build_telemetry_dataframe",
     "get_cache_age_seconds",
     "update_cache",
+    "refresh_cache",
+    "cache_worker_task",
 ]
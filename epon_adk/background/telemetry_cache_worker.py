@@ -6,24 +6,63 @@ Uses the parsing_agent for consistency with the agent-based architecture.
 """
 
 import asyncio
+import hashlib
+import itertools
 import json
+import re
 import time
+import traceback
 from pathlib import Path
 from threading import Thread
-from typing import Optional
+from typing import Dict, Optional, Set, Tuple, Union
 
-from epon_adk.db.netconf_log import get_latest_netconf_records
+import pandas as pd
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
 
+try:
+    import pyarrow  # noqa: F401  (enables the Parquet DataFrame snapshot)
+except ImportError:
+    pyarrow = None
+
+try:
+    import xxhash
+except ImportError:  # xxhash is optional; BLAKE2 is the fallback fingerprint
+    xxhash = None
+
+from epon_adk.agents.parsing_agent import parsing_agent
+from epon_adk.db.netconf_log import LOG_FILE as NETCONF_LOG_FILE, get_latest_netconf_records
+from epon_adk.utils import json_codec
+
+
+# First <onu-id> in a raw notification, used to split the log per ONU
+_ONU_ID_RE = re.compile(r"<onu-id(?:\s[^>]*)?>([^<]*)</onu-id>")
 
 # Cache configuration
 CACHE_DIR = Path(__file__).parent.parent / "cache"
 CACHE_FILE = CACHE_DIR / "parsed_telemetry.json"
+# Columnar snapshot of the DataFrame view, so restarts skip json_normalize
+CACHE_PARQUET_FILE = CACHE_DIR / "parsed_telemetry.parquet"
 CACHE_UPDATE_INTERVAL = 60  # seconds (1 minute default)
 
 # Global cache (shared across sessions)
 _global_parsed_cache: Optional[dict] = None
 _cache_timestamp: Optional[float] = None
 _last_processed_record_hash: Optional[str] = None  # Track latest data fingerprint
+_last_log_stat: Optional[Tuple[int, int]] = None  # (mtime_ns, size) of the log when last processed
+_last_batch_hashes: Dict[str, str] = {}  # ONU id -> fingerprint of the batch its cached entry came from
+_failed_onus: Set[str] = set()  # ONUs whose parse failed in the last update
+_global_dataframe: Optional[pd.DataFrame] = None  # Flattened view of the cache
+
+# parsing_agent Runner, created lazily and reused by every cache update
+PARSE_APP_NAME = "background_cache_worker"
+PARSE_USER_ID = "background_worker"
+_parse_runner = None
+_parse_session_service = None
+
+# Worker task when scheduled on a running loop (see start_background_worker)
+_worker_task: Optional[asyncio.Task] = None
 
 
 def get_global_cache() -> Optional[dict]:
@@ -31,6 +70,63 @@ def get_global_cache() -> Optional[dict]:
     return _global_parsed_cache
 
 
+def get_global_dataframe() -> Optional[pd.DataFrame]:
+    """Get the globally cached data as a flattened DataFrame (one row per event)."""
+    return _global_dataframe
+
+
+def build_telemetry_dataframe(parsed_data: Union[dict, list]) -> pd.DataFrame:
+    """
+    Flatten parsed telemetry into a DataFrame with dotted columns
+    (e.g. `qot.rx_power_dBm`). Accepts either a list of events or the
+    ONU-grouped dict produced by `parse_telemetry_log`.
+    """
+    if isinstance(parsed_data, dict):
+        parsed_data = list(itertools.chain.from_iterable(
+            items for items in parsed_data.values() if isinstance(items, list)
+        ))
+    return pd.json_normalize(parsed_data, sep='.')
+
+
+def _set_global_cache(parsed_data: Optional[dict], dataframe: Optional[pd.DataFrame] = None) -> None:
+    """
+    Replace the cached parsed data and its DataFrame view. The view is
+    rebuilt from `parsed_data` unless an already-built one is passed in.
+    """
+    global _global_parsed_cache, _global_dataframe
+
+    _global_parsed_cache = parsed_data
+    _global_dataframe = dataframe
+    if dataframe is None and parsed_data:
+        try:
+            _global_dataframe = build_telemetry_dataframe(parsed_data)
+        except Exception as e:
+            print(f"⚠️ Failed to build cached DataFrame: {e}")
+
+
+def _load_parquet_snapshot() -> Optional[pd.DataFrame]:
+    """Read the DataFrame snapshot if it is at least as new as the JSON cache."""
+    if pyarrow is None or not CACHE_PARQUET_FILE.exists():
+        return None
+    try:
+        if CACHE_PARQUET_FILE.stat().st_mtime_ns < CACHE_FILE.stat().st_mtime_ns:
+            return None
+        return pd.read_parquet(CACHE_PARQUET_FILE)
+    except Exception as e:
+        print(f"⚠️ Failed to load DataFrame snapshot: {e}")
+        return None
+
+
+def _save_parquet_snapshot() -> None:
+    """Write the DataFrame view next to the JSON cache (requires pyarrow)."""
+    if pyarrow is None or _global_dataframe is None:
+        return
+    try:
+        _global_dataframe.to_parquet(CACHE_PARQUET_FILE, index=False)
+    except Exception as e:
+        print(f"⚠️ Failed to save DataFrame snapshot: {e}")
+
+
 def get_cache_age_seconds() -> Optional[float]:
     """Get the age of the cache in seconds."""
     if _cache_timestamp is None:
@@ -40,16 +136,27 @@ def get_cache_age_seconds() -> Optional[float]:
 
 def compute_data_hash(records: list) -> str:
     """
-    Compute a simple hash of the telemetry records to detect changes.
-    Uses the first and last record as a fingerprint.
+    Compute a cheap, non-cryptographic fingerprint of the telemetry records
+    to detect changes. Covers the content of every record, so a change
+    anywhere in the batch is caught.
     """
-    import hashlib
     if not records:
         return ""
     
-    # Use first + last record as fingerprint (lightweight)
-    fingerprint = records[0] + records[-1]
-    return hashlib.md5(fingerprint.encode()).hexdigest()
+    # NUL-separated so record boundaries are part of the fingerprint
+    blob = "\x00".join(records).encode()
+    if xxhash is not None:
+        return xxhash.xxh3_64_hexdigest(blob)
+    return hashlib.blake2b(blob, digest_size=8).hexdigest()
+
+
+def _stat_netconf_log() -> Optional[Tuple[int, int]]:
+    """(mtime_ns, size) of the telemetry log, or None if it does not exist."""
+    try:
+        st = NETCONF_LOG_FILE.stat()
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
 
 
 def has_new_data(records: list) -> bool:
@@ -80,19 +187,21 @@ def has_new_data(records: list) -> bool:
 
 def load_cache_from_file() -> Optional[dict]:
     """Load cached data from JSON file."""
-    global _global_parsed_cache, _cache_timestamp, _last_processed_record_hash
+    global _cache_timestamp, _last_processed_record_hash, _last_log_stat, _last_batch_hashes
     
     if not CACHE_FILE.exists():
         return None
     
     try:
-        with open(CACHE_FILE, 'r') as f:
-            data = json.load(f)
-            _global_parsed_cache = data.get("parsed_data")
-            _cache_timestamp = data.get("timestamp")
-            _last_processed_record_hash = data.get("data_hash")  # Restore hash
-            print(f"✅ Loaded cache from file (age: {get_cache_age_seconds():.1f}s)")
-            return _global_parsed_cache
+        data = json_codec.loads(CACHE_FILE.read_bytes())
+        _set_global_cache(data.get("parsed_data"), _load_parquet_snapshot())
+        _cache_timestamp = data.get("timestamp")
+        _last_processed_record_hash = data.get("data_hash")  # Restore hash
+        log_stat = data.get("log_stat")
+        _last_log_stat = tuple(log_stat) if log_stat else None
+        _last_batch_hashes = data.get("onu_batch_hashes") or {}
+        print(f"✅ Loaded cache from file (age: {get_cache_age_seconds():.1f}s)")
+        return _global_parsed_cache
     except Exception as e:
         print(f"❌ Failed to load cache file: {e}")
         return None
@@ -100,117 +209,113 @@ def load_cache_from_file() -> Optional[dict]:
 
 def save_cache_to_file(parsed_data: dict) -> None:
     """Save parsed data to JSON file for persistence."""
-    global _global_parsed_cache, _cache_timestamp
+    global _cache_timestamp
     
     CACHE_DIR.mkdir(parents=True, exist_ok=True)
     
-    _global_parsed_cache = parsed_data
+    _set_global_cache(parsed_data)
     _cache_timestamp = time.time()
     
     cache_obj = {
         "parsed_data": parsed_data,
         "timestamp": _cache_timestamp,
         "timestamp_iso": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(_cache_timestamp)),
-        "data_hash": _last_processed_record_hash  # Save hash for next run
+        "data_hash": _last_processed_record_hash,  # Save hash for next run
+        "log_stat": _last_log_stat,
+        "onu_batch_hashes": _last_batch_hashes,
     }
     
     try:
-        with open(CACHE_FILE, 'w') as f:
-            json.dump(cache_obj, f, indent=2)
+        CACHE_FILE.write_bytes(json_codec.dumps_bytes(cache_obj, indent=True))
         print(f"💾 Cache saved to file: {CACHE_FILE}")
+        _save_parquet_snapshot()
     except Exception as e:
         print(f"❌ Failed to save cache file: {e}")
 
 
-async def fetch_and_parse_with_agent() -> Optional[dict]:
+async def fetch_and_parse_with_agent(records: Optional[list] = None) -> Optional[dict]:
     """
     Fetch raw telemetry and parse it using the parsing_agent.
     Returns the parsed data as a dict.
+
+    Records are split per ONU and each ONU's batch is parsed by its own
+    agent run, all running concurrently; the per-ONU results are merged.
+    ONUs whose batch is unchanged since it was last parsed keep their
+    cached entry and are not sent to the agent at all. An ONU whose run
+    fails keeps its last good entry as well.
+
+    Args:
+        records: Already-fetched raw records; fetched from the log if omitted.
     """
+    global _last_batch_hashes, _failed_onus
+    
+    _failed_onus = set()
     try:
-        from google.adk.runners import Runner
-        from google.adk.sessions import InMemorySessionService
-        from google.genai import types
-        from epon_adk.agents.parsing_agent import parsing_agent
-        
-        # Fetch raw telemetry (same as root agent does)
-        print("📡 Fetching telemetry data...")
-        records = get_latest_netconf_records(count=100, onu_id=None)
+        if records is None:
+            # Fetch raw telemetry (same as root agent does)
+            print("📡 Fetching telemetry data...")
+            records = await asyncio.to_thread(
+                get_latest_netconf_records, count=100, onu_id=None
+            )
         
         if not records:
             print("⚠️ No telemetry data available")
             return None
         
-        raw_log = "\n".join(records)
-        
-        # Parse using the parsing_agent
-        print("🤖 Parsing with parsing_agent...")
-        
-        # Create a temporary session for the agent
-        session_service = InMemorySessionService()
-        session = await session_service.create_session(
-            app_name="background_cache_worker",
-            user_id="background_worker"
-        )
-        
-        # Create runner for the parsing agent
-        runner = Runner(
-            app_name="background_cache_worker",
-            agent=parsing_agent,
-            session_service=session_service,
-        )
+        batches = _group_records_by_onu(records)
+        if not batches:
+            print("⚠️ No ONU records found in telemetry data")
+            return None
         
-        # Create the message content
-        content = types.Content(
-            role="user",
-            parts=[types.Part.from_text(text=raw_log)],
-        )
+        # Only ONUs whose records changed (or that have no cached entry) go
+        # through the agent; the rest reuse what is already cached
+        previous = _global_parsed_cache or {}
+        batch_hashes = {oid: compute_data_hash(batch) for oid, batch in batches.items()}
+        changed = [
+            oid for oid in batches
+            if oid not in previous or batch_hashes[oid] != _last_batch_hashes.get(oid)
+        ]
+        parsed_result = {oid: previous[oid] for oid in batches if oid not in changed}
         
-        # Run the agent
-        parsed_result = None
-        async for event in runner.run_async(
-            user_id=session.user_id,
-            session_id=session.id,
-            new_message=content
-        ):
-            # Check for tool results (parsing_agent calls parse_telemetry_log)
-            func_responses = event.get_function_responses()
-            if func_responses:
-                for fr in func_responses:
-                    print(f"🔍 Debug: Got function response from {fr.name}")
-                    print(f"🔍 Debug: Response type: {type(fr.response)}")
-                    print(f"🔍 Debug: Response preview: {str(fr.response)[:200]}")
-                    
-                    if fr.name == "parse_telemetry_log":
-                        # The response might be a dict or a JSON string
-                        if isinstance(fr.response, dict):
-                            parsed_result = fr.response
-                            print(f"✅ Got parsed result from tool (dict): {fr.name}")
-                        elif isinstance(fr.response, str):
-                            try:
-                                parsed_result = json.loads(fr.response)
-                                print(f"✅ Got parsed result from tool (JSON string): {fr.name}")
-                            except json.JSONDecodeError as e:
-                                print(f"⚠️ Failed to parse JSON from tool response: {e}")
-                                print(f"   Response was: {fr.response[:500]}")
-                        else:
-                            # Direct assignment if it's already parsed
-                            parsed_result = fr.response
-                            print(f"✅ Got parsed result from tool (other type): {fr.name}")
+        if changed:
+            # Parse using the parsing_agent
+            print(f"🤖 Parsing {len(changed)} of {len(batches)} ONU batches with parsing_agent...")
+            
+            # Runner and session service are reused across updates; each run
+            # still gets its own session
+            runner, session_service = _get_parse_runner()
             
-            # Also check final response as fallback
-            if event.is_final_response() and parsed_result is None:
-                if event.content and event.content.parts:
-                    # Try to extract from text parts
-                    for part in event.content.parts:
-                        if part.text:
-                            try:
-                                parsed_result = json.loads(part.text)
-                                print("✅ Got parsed result from final text")
-                                break
-                            except json.JSONDecodeError:
-                                # Text is not JSON, skip
-                                continue
+            results = await asyncio.gather(
+                *(
+                    _parse_with_agent(runner, session_service, "\n".join(batches[oid]))
+                    for oid in changed
+                ),
+                return_exceptions=True,
+            )
+            
+            for onu_id, result in zip(changed, results):
+                if isinstance(result, dict) and result:
+                    parsed_result.update(result)
+                    continue
+                if isinstance(result, BaseException):
+                    print(f"⚠️ Parsing failed for ONU-{onu_id}: {result}")
+                else:
+                    print(f"⚠️ Parsing returned no data for ONU-{onu_id}")
+                _failed_onus.add(onu_id)
+                # Keep the last good entry rather than dropping the ONU from
+                # the cache that replaces the current one
+                if onu_id in previous:
+                    parsed_result[onu_id] = previous[onu_id]
+        else:
+            print(f"⏭️ All {len(batches)} ONU batches unchanged, reusing cached results")
+        
+        # Remember which batch each returned entry came from; failed ONUs get
+        # no fingerprint (even when an older entry was kept) so they are
+        # retried next time
+        _last_batch_hashes = {
+            oid: batch_hashes[oid] for oid in parsed_result
+            if oid in batch_hashes and oid not in _failed_onus
+        }
         
         if parsed_result:
             print(f"✅ Parsed data for {len(parsed_result)} ONUs")
@@ -221,29 +326,142 @@ async def fetch_and_parse_with_agent() -> Optional[dict]:
         
     except Exception as e:
         print(f"❌ Error in fetch_and_parse_with_agent: {e}")
-        import traceback
         traceback.print_exc()
         return None
 
 
-def update_cache():
-    """Main cache update function - fetches, checks for changes, parses if needed, and saves."""
+def _get_parse_runner():
+    """Create the parsing_agent Runner and its session service on first use."""
+    global _parse_runner, _parse_session_service
+    
+    if _parse_runner is None:
+        _parse_session_service = InMemorySessionService()
+        _parse_runner = Runner(
+            app_name=PARSE_APP_NAME,
+            agent=parsing_agent,
+            session_service=_parse_session_service,
+        )
+    return _parse_runner, _parse_session_service
+
+
+def _group_records_by_onu(records: list) -> dict:
+    """Group raw records by their <onu-id>, keeping log order within each ONU."""
+    batches: dict = {}
+    for record in records:
+        m = _ONU_ID_RE.search(record)
+        if m:
+            batches.setdefault(m.group(1).strip(), []).append(record)
+    return batches
+
+
+async def _parse_with_agent(runner, session_service, raw_log: str) -> Optional[dict]:
+    """Run the parsing_agent once on `raw_log` and return the tool's parsed result."""
+    # Create a temporary session for the agent
+    session = await session_service.create_session(
+        app_name=PARSE_APP_NAME,
+        user_id=PARSE_USER_ID
+    )
+    try:
+        return await _run_parse_session(runner, session, raw_log)
+    finally:
+        # The session service outlives this run; drop the session so
+        # finished runs don't pile up in memory
+        await session_service.delete_session(
+            app_name=PARSE_APP_NAME,
+            user_id=PARSE_USER_ID,
+            session_id=session.id,
+        )
+
+
+async def _run_parse_session(runner, session, raw_log: str) -> Optional[dict]:
+    """Send `raw_log` to the parsing_agent in `session` and collect the result."""
+    # Create the message content
+    content = types.Content(
+        role="user",
+        parts=[types.Part(text=raw_log)],
+    )
+    
+    # Run the agent
+    parsed_result = None
+    async for event in runner.run_async(
+        user_id=session.user_id,
+        session_id=session.id,
+        new_message=content
+    ):
+        # Check for tool results (parsing_agent calls parse_telemetry_log)
+        func_responses = event.get_function_responses()
+        if func_responses:
+            for fr in func_responses:
+                print(f"🔍 Debug: Got function response from {fr.name}")
+                print(f"🔍 Debug: Response type: {type(fr.response)}")
+                print(f"🔍 Debug: Response preview: {str(fr.response)[:200]}")
+                
+                if fr.name == "parse_telemetry_log":
+                    # The response might be a dict or a JSON string
+                    if isinstance(fr.response, dict):
+                        parsed_result = fr.response
+                        print(f"✅ Got parsed result from tool (dict): {fr.name}")
+                    elif isinstance(fr.response, str):
+                        try:
+                            parsed_result = json.loads(fr.response)
+                            print(f"✅ Got parsed result from tool (JSON string): {fr.name}")
+                        except json.JSONDecodeError as e:
+                            print(f"⚠️ Failed to parse JSON from tool response: {e}")
+                            print(f"   Response was: {fr.response[:500]}")
+                    else:
+                        # Direct assignment if it's already parsed
+                        parsed_result = fr.response
+                        print(f"✅ Got parsed result from tool (other type): {fr.name}")
+        
+        # Also check final response as fallback
+        if event.is_final_response() and parsed_result is None:
+            if event.content and event.content.parts:
+                # Try to extract from text parts
+                for part in event.content.parts:
+                    if part.text:
+                        try:
+                            parsed_result = json.loads(part.text)
+                            print("✅ Got parsed result from final text")
+                            break
+                        except json.JSONDecodeError:
+                            # Text is not JSON, skip
+                            continue
+    
+    return parsed_result
+
+
+async def refresh_cache() -> None:
+    """Main cache update - fetches, checks for changes, parses if needed, and saves."""
+    global _last_log_stat, _last_processed_record_hash
+    
     print("\n" + "="*60)
     print(f"🔄 Background cache update starting...")
     print("="*60)
     
+    # Step 0: stat() the log; an unchanged (mtime, size) means nothing to read
+    log_stat = _stat_netconf_log()
+    if log_stat is not None and log_stat == _last_log_stat:
+        print("✅ Log file unchanged since last update, skipping")
+        print("="*60 + "\n")
+        return
+    
     # Step 1: Fetch raw telemetry records (lightweight check)
     try:
         print("📡 Fetching telemetry data for change detection...")
-        records = get_latest_netconf_records(count=100, onu_id=None)
+        # File IO runs in a worker thread so the event loop stays responsive
+        records = await asyncio.to_thread(
+            get_latest_netconf_records, count=100, onu_id=None
+        )
         
         if not records:
             print("⚠️ No telemetry data available")
             print("="*60 + "\n")
             return
         
-        # Step 2: Check if data has changed
+        # Step 2: Check if data has changed (content hash catches same-stat edits
+        # and touch-only changes)
         if not has_new_data(records):
+            _last_log_stat = log_stat
             print("✅ Cache is up-to-date, skipping parsing")
             print("="*60 + "\n")
             return
@@ -256,11 +474,19 @@ def update_cache():
         print("="*60 + "\n")
         return
     
-    # Step 4: Run async parsing (only if data changed)
-    parsed_data = asyncio.run(fetch_and_parse_with_agent())
+    # Step 4: Parse the records we already fetched (only if data changed)
+    parsed_data = await fetch_and_parse_with_agent(records)
+    
+    if parsed_data and not _failed_onus:
+        # Only remember the stat once everything parsed
+        _last_log_stat = log_stat
+    else:
+        # Forget the content hash as well, so the next update re-reads the
+        # log and retries; ONUs that did parse are skipped by fingerprint
+        _last_processed_record_hash = None
     
     if parsed_data:
-        save_cache_to_file(parsed_data)
+        await asyncio.to_thread(save_cache_to_file, parsed_data)
         print(f"✅ Cache updated successfully with new data")
     else:
         print(f"⚠️ Cache update failed - parsing returned no data")
@@ -268,48 +494,82 @@ def update_cache():
     print("="*60 + "\n")
 
 
+def update_cache():
+    """Run one cache update to completion (for synchronous callers)."""
+    asyncio.run(refresh_cache())
 
-def cache_worker_loop(interval_seconds: int = CACHE_UPDATE_INTERVAL):
+
+async def cache_worker_task(interval_seconds: int = CACHE_UPDATE_INTERVAL) -> None:
     """
-    Background worker loop that updates cache periodically.
+    Refresh the cache now and then every `interval_seconds`, forever.
+    
+    Meant to be scheduled once as a long-lived task on the app's event loop.
     
     Args:
         interval_seconds: How often to update the cache (default: 60s)
     """
     print(f"🚀 Starting background cache worker (interval: {interval_seconds}s)")
     
-    # Initial cache update on startup
-    update_cache()
-    
     while True:
         try:
-            time.sleep(interval_seconds)
-            update_cache()
-        except KeyboardInterrupt:
-            print("⏹️ Background worker stopped by user")
-            break
+            await refresh_cache()
         except Exception as e:
             print(f"❌ Error in background worker: {e}")
-            import traceback
             traceback.print_exc()
             # Continue running even if one update fails
-            time.sleep(interval_seconds)
+        await asyncio.sleep(interval_seconds)
 
 
-def start_background_worker(interval_seconds: int = CACHE_UPDATE_INTERVAL) -> Thread:
+def cache_worker_loop(interval_seconds: int = CACHE_UPDATE_INTERVAL):
     """
-    Start the background cache worker in a separate thread.
+    Run `cache_worker_task` on its own event loop until interrupted.
+    
+    Used when there is no running loop to schedule the task on (standalone
+    mode, synchronous servers).
+    
+    Args:
+        interval_seconds: How often to update the cache (default: 60s)
+    """
+    try:
+        asyncio.run(cache_worker_task(interval_seconds))
+    except KeyboardInterrupt:
+        print("⏹️ Background worker stopped by user")
+
+
+def start_background_worker(
+    interval_seconds: int = CACHE_UPDATE_INTERVAL,
+) -> Union[asyncio.Task, Thread]:
+    """
+    Start the background cache worker.
+    
+    When called from a running event loop the worker becomes a task on that
+    loop; otherwise a daemon thread hosts a single loop for it.
     
     Args:
         interval_seconds: Update interval in seconds
         
     Returns:
-        The Thread object (for monitoring/stopping if needed)
+        The Task or Thread object (for monitoring/stopping if needed)
     """
+    global _worker_task
+    
     # Try to load existing cache from file on startup
     load_cache_from_file()
     
-    # Start background thread
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    
+    if loop is not None:
+        # Keep a reference: the loop only holds tasks weakly
+        _worker_task = loop.create_task(
+            cache_worker_task(interval_seconds), name="TelemetryCacheWorker"
+        )
+        print(f"✅ Background cache worker started (task: {_worker_task.get_name()})")
+        return _worker_task
+    
+    # No loop to join: start a background thread running one loop
     worker_thread = Thread(
         target=cache_worker_loop,
         args=(interval_seconds,),
@@ -1,9 +1,26 @@
+import os
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional, List
-import xml.etree.ElementTree as ET
+from typing import Dict, Optional, List, Tuple
+import re
+
+from lxml import etree
 
 LOG_FILE = Path(__file__).parent / "epon_netconf_telemetry.log"
 
+# One complete notification block in the raw log bytes
+_NOTIFICATION_RE = re.compile(rb"<notification\b.*?</notification>", re.DOTALL)
+# <onu-id> in any namespace; iter() with a tag filter walks the tree in C and
+# stops at the first hit, unlike a local-name() XPath which visits every node
+_ONU_ID_TAG = "{*}onu-id"
+# Upper estimate of one notification's size on disk, for tail reads
+_RECORD_SIZE_HINT = 800
+
+# Results for the current log version, keyed by (count, onu_id). The log is
+# identified by its (mtime_ns, size); any write changes that and drops the
+# cached results, so only one version is ever kept.
+_records_cache: Dict[Tuple[int, int], Dict[Tuple[int, Optional[str]], List[str]]] = {}
+
 
 def get_latest_netconf_records(count: int = 10, onu_id: Optional[str] = None) -> List[str]:
     """
@@ -16,46 +33,68 @@ def get_latest_netconf_records(count: int = 10, onu_id: Optional[str] = None) ->
     Returns:
         List of raw NETCONF XML strings
     """
-    if not LOG_FILE.exists():
+    try:
+        st = LOG_FILE.stat()
+    except FileNotFoundError:
         return []
     
-    # Read all records (each notification is separated by newlines)
-    with open(LOG_FILE, "r", encoding="utf-8") as f:
-        content = f.read()
-    
-    # Split by notification tags
-    records = []
-    current_record = []
-    
-    for line in content.split("\n"):
-        if line.strip().startswith("<notification"):
-            current_record = [line]
-        elif line.strip().startswith("</notification>"):
-            current_record.append(line)
-            records.append("\n".join(current_record))
-            current_record = []
-        elif current_record:
-            current_record.append(line)
-    
-    # Filter by ONU if specified
-    if onu_id:
-        filtered = []
-        for record in records:
-            try:
-                root = ET.fromstring(record)
-                # Remove namespace
-                for elem in root.iter():
-                    if "}" in elem.tag:
-                        elem.tag = elem.tag.split("}", 1)[1]
-                onu_elem = root.find(".//onu-id")
-                if onu_elem is not None and str(onu_elem.text) == str(onu_id):
-                    filtered.append(record)
-            except ET.ParseError:
-                continue
-        return filtered[-count:] if filtered else []
+    fingerprint = (st.st_mtime_ns, st.st_size)
+    results = _records_cache.get(fingerprint)
+    if results is None:
+        _records_cache.clear()
+        results = _records_cache[fingerprint] = {}
+    
+    key = (count, str(onu_id) if onu_id else None)
+    if key not in results:
+        results[key] = _read_latest_records(st.st_size, count, onu_id)
+    # Copy so callers cannot modify the cached list
+    return list(results[key])
+
+
+def _read_latest_records(size: int, count: int, onu_id: Optional[str]) -> List[str]:
+    """Read the newest `count` records (optionally for one ONU) from the log."""
+    # Read only a window at the end of the file, sized for `count` records,
+    # and widen it when it holds too few (e.g. a sparse ONU filter).
+    window = size if count <= 0 else min(size, count * _RECORD_SIZE_HINT + 4096)
+    
+    with open(LOG_FILE, "rb") as f:
+        while True:
+            f.seek(size - window)
+            # A record cut off at the window start has no opening tag left,
+            # so the scan skips it.
+            records = _NOTIFICATION_RE.findall(f.read(window))
+            
+            # Filter by ONU if specified
+            if onu_id:
+                records = _filter_by_onu(records, onu_id, count)
+            
+            if (count > 0 and len(records) >= count) or window >= size:
+                break
+            window = min(size, window * 4)
     
     # Return the most recent ones
-    return records[-count:] if records else []
+    return [r.decode("utf-8") for r in records[-count:]] if records else []
+
+
+def _filter_by_onu(records: List[bytes], onu_id: str, count: int) -> List[bytes]:
+    """
+    Keep the newest `count` raw records whose <onu-id> matches `onu_id`
+    (all of them if count <= 0), in log order.
+    """
+    wanted = str(onu_id)
+    matched = []
+    # Newest first, so the scan can stop as soon as enough records match
+    for record in reversed(records):
+        try:
+            onu_el = next(etree.fromstring(record).iter(_ONU_ID_TAG), None)
+        except etree.XMLSyntaxError:
+            continue
+        if onu_el is not None and onu_el.text == wanted:
+            matched.append(record)
+            if len(matched) == count:
+                break
+    matched.reverse()
+    return matched
 
 
 def get_single_netconf_record(onu_id: str) -> Optional[str]:
@@ -79,38 +118,65 @@ def clear_log():
     print(f"Cleared telemetry log: {LOG_FILE}")
 
 
-def inject_degraded_signal(onu_id: int):
-    """
-    Inject a degraded signal event for a specific ONU.
-    
-    This is used for testing/simulation purposes.
-    """
-    from datetime import datetime, timezone
-    
-    ts = datetime.now(timezone.utc).isoformat(timespec="milliseconds")
-    
-    xml = f"""<notification xmlns="urn:ietf:params:xml:ns:netconf:notification:1.0">
+# Notification written by the inject_* helpers; only the metric values and
+# their annotations differ between signal kinds
+_INJECT_TEMPLATE = """<notification xmlns="urn:ietf:params:xml:ns:netconf:notification:1.0">
   <eventTime>{ts}</eventTime>
   <onu-telemetry xmlns="urn:vendor:epon:telemetry">
     <olt-id>OLT-01</olt-id>
     <onu-id>{onu_id}</onu-id>
-    <rx-power>-29.5</rx-power>           <!-- dBm - degraded -->
-    <snr>12.3</snr>                      <!-- dB - low -->
-    <ber-pre-fec>5.2e-05</ber-pre-fec>   <!-- high -->
-    <ber-post-fec>5.2e-07</ber-post-fec>
-    <temperature>78.2</temperature>      <!-- Celsius - high -->
+    <rx-power>{rx_power}</rx-power>           <!-- dBm - {rx_power_note} -->
+    <snr>{snr}</snr>                      <!-- dB - {snr_note} -->
+    <ber-pre-fec>{ber_pre_fec}</ber-pre-fec>   <!-- {ber_note} -->
+    <ber-post-fec>{ber_post_fec}</ber-post-fec>
+    <temperature>{temperature}</temperature>      <!-- Celsius - {temperature_note} -->
     <alarms>
-      <qot-degrade>true</qot-degrade>
-      <dsp-adaptation>slow</dsp-adaptation>
+      <qot-degrade>{qot_degrade}</qot-degrade>
+      <dsp-adaptation>{dsp_adaptation}</dsp-adaptation>
     </alarms>
   </onu-telemetry>
 </notification>
+
 """
+
+_DEGRADED_SIGNAL = {
+    "rx_power": "-29.5", "rx_power_note": "degraded",
+    "snr": "12.3", "snr_note": "low",
+    "ber_pre_fec": "5.2e-05", "ber_post_fec": "5.2e-07", "ber_note": "high",
+    "temperature": "78.2", "temperature_note": "high",
+    "qot_degrade": "true", "dsp_adaptation": "slow",
+}
+
+_NORMAL_SIGNAL = {
+    "rx_power": "-22.0", "rx_power_note": "good",
+    "snr": "24.5", "snr_note": "good",
+    "ber_pre_fec": "2.1e-09", "ber_post_fec": "2.1e-11", "ber_note": "low",
+    "temperature": "52.0", "temperature_note": "normal",
+    "qot_degrade": "false", "dsp_adaptation": "normal",
+}
+
+
+def _inject_signal(onu_id: int, signal: Dict[str, str]) -> None:
+    """Append one notification built from `signal` to the log."""
+    ts = datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+    payload = _INJECT_TEMPLATE.format(ts=ts, onu_id=onu_id, **signal).encode("utf-8")
+    
+    # One write on an O_APPEND descriptor, so the block lands in one piece
+    # even while the generator is appending to the same file
+    fd = os.open(LOG_FILE, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, payload)
+    finally:
+        os.close(fd)
+
+
+def inject_degraded_signal(onu_id: int):
+    """
+    Inject a degraded signal event for a specific ONU.
     
-    with open(LOG_FILE, "a", encoding="utf-8") as f:
-        f.write(xml)
-        f.write("\n")
-    
+    This is used for testing/simulation purposes.
+    """
+    _inject_signal(onu_id, _DEGRADED_SIGNAL)
     print(f"Injected degraded signal event for ONU-{onu_id}")
 
 
@@ -118,30 +184,5 @@ def inject_normal_signal(onu_id: int):
     """
     Inject a normal/healthy signal event for a specific ONU.
     """
-    from datetime import datetime, timezone
-    
-    ts = datetime.now(timezone.utc).isoformat(timespec="milliseconds")
-    
-    xml = f"""<notification xmlns="urn:ietf:params:xml:ns:netconf:notification:1.0">
-  <eventTime>{ts}</eventTime>
-  <onu-telemetry xmlns="urn:vendor:epon:telemetry">
-    <olt-id>OLT-01</olt-id>
-    <onu-id>{onu_id}</onu-id>
-    <rx-power>-22.0</rx-power>           <!-- dBm - good -->
-    <snr>24.5</snr>                      <!-- dB - good -->
-    <ber-pre-fec>2.1e-09</ber-pre-fec>   <!-- low -->
-    <ber-post-fec>2.1e-11</ber-post-fec>
-    <temperature>52.0</temperature>      <!-- Celsius - normal -->
-    <alarms>
-      <qot-degrade>false</qot-degrade>
-      <dsp-adaptation>normal</dsp-adaptation>
-    </alarms>
-  </onu-telemetry>
-</notification>
-"""
-    
-    with open(LOG_FILE, "a", encoding="utf-8") as f:
-        f.write(xml)
-        f.write("\n")
-    
+    _inject_signal(onu_id, _NORMAL_SIGNAL)
     print(f"Injected normal signal event for ONU-{onu_id}")
@@ -1,8 +1,11 @@
+import atexit
+import os
 import time
-import random
 from datetime import datetime, timezone
 from pathlib import Path
 
+import numpy as np
+
 # ================== CONFIG ==================
 LOG_FILE = Path(__file__).parent / "db" / "epon_netconf_telemetry.log"
 INTERVAL_SECONDS = 5        # change this to your desired interval (e.g. 1, 10, 60)
@@ -10,103 +13,146 @@ NUM_ONUS = 8                # number of simulated ONUs
 OLT_ID = "OLT-01"
 # ============================================
 
-# Keep simple state per ONU so values drift realistically
-onu_state = {
-    onu_id: {
-        "rx_power": -23.0 + random.uniform(-2, 2),   # dBm
-        "snr": 22.0 + random.uniform(-3, 3),         # dB
-        "temp": 55.0 + random.uniform(-5, 5)         # °C
-    }
-    for onu_id in range(1, NUM_ONUS + 1)
-}
+_rng = np.random.default_rng()
+
+# Simple state per ONU so values drift realistically, stored as one array per
+# metric (index i is ONU i + 1) so each tick updates every ONU at once
+_rx_power = -23.0 + _rng.uniform(-2, 2, NUM_ONUS)   # dBm
+_snr = 22.0 + _rng.uniform(-3, 3, NUM_ONUS)         # dB
+_temp = 55.0 + _rng.uniform(-5, 5, NUM_ONUS)        # °C
 
-def generate_onu_metrics(onu_id: int) -> dict:
-    """Generate one telemetry sample for a given ONU with slight random drift."""
-    s = onu_state[onu_id]
+def generate_all_onu_metrics() -> list:
+    """Generate one telemetry sample per ONU, applying slight random drift to all of them."""
+    global _rx_power, _snr, _temp  # updated in place
+    n = NUM_ONUS
 
     # Smooth drift
-    s["rx_power"] += random.uniform(-0.2, 0.2)
-    s["snr"]      += random.uniform(-0.5, 0.5)
-    s["temp"]     += random.uniform(-0.2, 0.2)
+    _rx_power += _rng.uniform(-0.2, 0.2, n)
+    _snr      += _rng.uniform(-0.5, 0.5, n)
+    _temp     += _rng.uniform(-0.2, 0.2, n)
 
     # Clamp to reasonable ranges
-    s["rx_power"] = max(-30.0, min(-15.0, s["rx_power"]))
-    s["snr"]      = max(10.0,  min(30.0, s["snr"]))
-    s["temp"]     = max(40.0,  min(80.0, s["temp"]))
+    np.clip(_rx_power, -30.0, -15.0, out=_rx_power)
+    np.clip(_snr,      10.0,  30.0,  out=_snr)
+    np.clip(_temp,     40.0,  80.0,  out=_temp)
 
     # BER & FEC based on SNR (very rough)
-    snr = s["snr"]
-    ber_pre = 10 ** (-snr / 5.0)           # just a toy model
+    ber_pre = 10 ** (-_snr / 5.0)          # just a toy model
     ber_post = ber_pre / 100.0
 
-    # Occasionally create a degradation / anomaly
-    qot_degrade = False
-    dsp_slow = False
-    if random.random() < 0.05:  # 5% chance
-        s["rx_power"] -= random.uniform(1, 3)
-        s["snr"]      -= random.uniform(2, 5)
-        s["temp"]     += random.uniform(1, 3)
-        qot_degrade = True
-        if random.random() < 0.5:
-            dsp_slow = True
-
-    return {
-        "olt_id": OLT_ID,
-        "onu_id": onu_id,
-        "rx_power": round(s["rx_power"], 2),
-        "snr": round(s["snr"], 2),
-        "ber_pre": f"{ber_pre:.2e}",
-        "ber_post": f"{ber_post:.2e}",
-        "temperature": round(s["temp"], 1),
-        "qot_degrade": qot_degrade,
-        "dsp_slow": dsp_slow,
-    }
+    # Occasionally create a degradation / anomaly (5% chance per ONU)
+    qot_degrade = _rng.random(n) < 0.05
+    k = int(qot_degrade.sum())
+    if k:
+        _rx_power[qot_degrade] -= _rng.uniform(1, 3, k)
+        _snr[qot_degrade]      -= _rng.uniform(2, 5, k)
+        _temp[qot_degrade]     += _rng.uniform(1, 3, k)
+    dsp_slow = qot_degrade & (_rng.random(n) < 0.5)
 
-def build_netconf_notification_xml(ts_iso: str, m: dict) -> str:
-    """Build a NETCONF-style XML notification string."""
-    xml = f"""<notification xmlns="urn:ietf:params:xml:ns:netconf:notification:1.0">
-  <eventTime>{ts_iso}</eventTime>
+    return [
+        {
+            "olt_id": OLT_ID,
+            "onu_id": i + 1,
+            "rx_power": round(rx, 2),
+            "snr": round(snr, 2),
+            "ber_pre": f"{bpre:.2e}",
+            "ber_post": f"{bpost:.2e}",
+            "temperature": round(temp, 1),
+            # Alarm leaves are returned as their XML text
+            "qot_degrade": "true" if degrade else "false",
+            "dsp_adaptation": "slow" if slow else "normal",
+        }
+        for i, (rx, snr, temp, bpre, bpost, degrade, slow) in enumerate(zip(
+            _rx_power.tolist(), _snr.tolist(), _temp.tolist(),
+            ber_pre.tolist(), ber_post.tolist(),
+            qot_degrade.tolist(), dsp_slow.tolist(),
+        ))
+    ]
+
+# Notification layout, filled with str.format; field names match the dict
+# returned by generate_all_onu_metrics, plus `ts`.
+_NOTIFICATION_TEMPLATE = """<notification xmlns="urn:ietf:params:xml:ns:netconf:notification:1.0">
+  <eventTime>{ts}</eventTime>
   <onu-telemetry xmlns="urn:vendor:epon:telemetry">
-    <olt-id>{m['olt_id']}</olt-id>
-    <onu-id>{m['onu_id']}</onu-id>
-    <rx-power>{m['rx_power']}</rx-power>           <!-- dBm -->
-    <snr>{m['snr']}</snr>                          <!-- dB -->
-    <ber-pre-fec>{m['ber_pre']}</ber-pre-fec>
-    <ber-post-fec>{m['ber_post']}</ber-post-fec>
-    <temperature>{m['temperature']}</temperature>  <!-- Celsius -->
+    <olt-id>{olt_id}</olt-id>
+    <onu-id>{onu_id}</onu-id>
+    <rx-power>{rx_power}</rx-power>           <!-- dBm -->
+    <snr>{snr}</snr>                          <!-- dB -->
+    <ber-pre-fec>{ber_pre}</ber-pre-fec>
+    <ber-post-fec>{ber_post}</ber-post-fec>
+    <temperature>{temperature}</temperature>  <!-- Celsius -->
     <alarms>
-      <qot-degrade>{"true" if m['qot_degrade'] else "false"}</qot-degrade>
-      <dsp-adaptation>{"slow" if m['dsp_slow'] else "normal"}</dsp-adaptation>
+      <qot-degrade>{qot_degrade}</qot-degrade>
+      <dsp-adaptation>{dsp_adaptation}</dsp-adaptation>
     </alarms>
   </onu-telemetry>
 </notification>
 """
-    return xml
+
+def build_netconf_notification_xml(ts_iso: str, m: dict) -> str:
+    """Build a NETCONF-style XML notification string."""
+    return _NOTIFICATION_TEMPLATE.format(ts=ts_iso, **m)
+
+# Cap the log by size to prevent unlimited growth. Once a write takes the file
+# past MAX_LOG_BYTES it is trimmed to its newest ROTATE_KEEP_BYTES (cut at a
+# notification boundary), so the trim - a full rewrite - happens only once in
+# a while and every other write is a plain append.
+MAX_LOG_BYTES = 200_000
+ROTATE_KEEP_BYTES = 100_000
+
+# Append handle kept open across writes; reopened after each rotation
+_log_fp = None
+
+def _get_log_fp():
+    """Return the open append handle for LOG_FILE, opening it on first use."""
+    global _log_fp
+
+    if _log_fp is None:
+        LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+        _log_fp = open(LOG_FILE, "ab", buffering=1 << 16)
+    return _log_fp
+
+def _close_log_fp():
+    """Close the append handle, if open."""
+    global _log_fp
+
+    if _log_fp is not None:
+        _log_fp.close()
+        _log_fp = None
+
+atexit.register(_close_log_fp)
+
+def _rotate_log():
+    """Trim the log to its newest notifications via an atomic replace."""
+    with open(LOG_FILE, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - ROTATE_KEEP_BYTES))
+        tail = f.read()
+
+    # Drop the partial notification at the front of the window
+    start = tail.find(b"<notification")
+    tail = tail[start:] if start != -1 else b""
+
+    tmp_file = LOG_FILE.with_suffix(".tmp")
+    with open(tmp_file, "wb") as f:
+        f.write(tail)
+    os.replace(tmp_file, LOG_FILE)
+    # The old handle still points at the replaced file
+    _close_log_fp()
 
 def append_to_log(text: str):
-    LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
-    
-    # Read existing content
-    if LOG_FILE.exists():
-        with open(LOG_FILE, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-    else:
-        lines = []
-    
-    # Append new text
-    new_lines = text.splitlines(keepends=True)
-    new_lines.append("\n") # Add separator
-    lines.extend(new_lines)
-    
-    # Keep only the last 500 lines (approx 10-15 notifications) to prevent unlimited growth
-    # Each notification is ~15 lines. 500 lines = ~30 notifications.
-    MAX_LINES = 500
-    if len(lines) > MAX_LINES:
-        lines = lines[-MAX_LINES:]
-        
-    # Write back
-    with open(LOG_FILE, "w", encoding="utf-8") as f:
-        f.writelines(lines)
+    """Append one or more notifications (plus a separator line) in a single write."""
+    f = _get_log_fp()
+
+    # Append new text plus a separator line; flushed so readers see whole ticks
+    f.write((text + "\n").encode("utf-8"))
+    f.flush()
+    # Append mode leaves the position at end of file: this is its size,
+    # including anything other writers (inject_*) appended
+    size = f.tell()
+
+    if size > MAX_LOG_BYTES:
+        _rotate_log()
 
 def main():
     print(f"Starting EPON NETCONF telemetry generator.")
@@ -117,10 +163,12 @@ def main():
     try:
         while True:
             ts = datetime.now(timezone.utc).isoformat(timespec="milliseconds")
-            for onu_id in range(1, NUM_ONUS + 1):
-                metrics = generate_onu_metrics(onu_id)
-                xml = build_netconf_notification_xml(ts, metrics)
-                append_to_log(xml)
+            xmls = [
+                build_netconf_notification_xml(ts, metrics)
+                for metrics in generate_all_onu_metrics()
+            ]
+            # One append per tick; same layout as one append per notification
+            append_to_log("\n".join(xmls))
             print(f"[{ts}] wrote telemetry for {NUM_ONUS} ONUs")
             time.sleep(INTERVAL_SECONDS)
     except KeyboardInterrupt:
@@ -1,12 +1,26 @@
 """
 Simple test to verify NETCONF parsing and compliance checking logic.
 """
+import asyncio
 import sys
+import tempfile
 from pathlib import Path
+from types import SimpleNamespace
 sys.path.insert(0, str(Path(__file__).parent.parent))
+# The background worker imports through the epon_adk package
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 from agents.parsing_agent import parse_telemetry_log
-from agents.compliance_agent import check_ieee_8023_compliance
+from agents.compliance_agent import (
+    check_ieee_8023_compliance,
+    check_ieee_8023_compliance_batch,
+    check_ieee_8023_compliance_events,
+    classify_vendor_hints,
+)
+from utils.event_logger import init_logs, reset_logs, get_logs, log_adk_event
+from db import netconf_log
+import netconf_generator
+from epon_adk.background import telemetry_cache_worker
 
 
 def test_parsing():
@@ -59,6 +73,37 @@ def test_parsing():
     print("  ✓ Batch parsing: OK")
 
 
+def test_parsing_prefixed_tags():
+    """Test that namespace-prefixed elements are parsed like unprefixed ones."""
+    print("\nTesting NETCONF Parsing (Prefixed Tags)...")
+
+    sample_xml = """<nc:notification xmlns:nc="urn:ietf:params:xml:ns:netconf:notification:1.0">
+  <nc:eventTime>2025-11-24T10:00:00.000+00:00</nc:eventTime>
+  <t:onu-telemetry xmlns:t="urn:vendor:epon:telemetry">
+    <t:olt-id>OLT-01</t:olt-id>
+    <t:onu-id>4</t:onu-id>
+    <t:rx-power>-24.1</t:rx-power>
+    <t:snr>20.5</t:snr>
+    <t:alarms>
+      <t:qot-degrade>true</t:qot-degrade>
+      <t:dsp-adaptation>slow</t:dsp-adaptation>
+    </t:alarms>
+  </t:onu-telemetry>
+</nc:notification>"""
+
+    result = parse_telemetry_log(sample_xml)
+
+    assert list(result) == ["4"]
+    event = result["4"][0]
+    assert event["timestamp"] == "2025-11-24T10:00:00.000+00:00"
+    assert event["olt_id"] == "OLT-01"
+    assert event["qot"]["rx_power_dBm"] == -24.1
+    assert event["qot"]["snr_dB"] == 20.5
+    assert event["status"] == {"qot_degrade": True, "dsp_adaptation": "slow"}
+
+    print("  ✓ Prefixed tag parsing: OK")
+
+
 def test_compliance_normal():
     """Test compliance check for normal signal."""
     print("\nTesting Compliance (Normal Signal)...")
@@ -123,11 +168,294 @@ def test_compliance_degraded():
     print("  ✓ Degraded signal compliance: OK")
 
 
+def test_compliance_batch_matches_single():
+    """Test the vectorized batch check agrees with the per-event check."""
+    print("\nTesting Compliance (Batch vs Single)...")
+    import pandas as pd
+
+    def _event(onu_id, rx, snr, ber_pre, temp, qot_degrade, dsp):
+        return {
+            "timestamp": "2025-11-24T10:00:00Z",
+            "olt_id": "OLT-01",
+            "onu_id": onu_id,
+            "qot": {
+                "rx_power_dBm": rx,
+                "snr_dB": snr,
+                "ber_pre_fec": ber_pre,
+                "ber_post_fec": None,
+                "temperature": temp,
+            },
+            "status": {"qot_degrade": qot_degrade, "dsp_adaptation": dsp},
+        }
+
+    events = [
+        _event("1", -23.5, 22.0, 1.2e-09, 55.0, False, "normal"),
+        _event("2", -29.5, 12.3, 5.2e-05, 78.2, True, "slow"),
+        _event("3", -27.0, 14.0, 2.0e-04, None, None, "TRACKING"),
+        _event("4", None, 11.0, 2.0e-03, 60.0, False, None),
+        # Integer metrics must render in the cause text as they do per event
+        _event("5", -29, 11, 2.0e-03, 78, False, "slow"),
+    ]
+
+    batch = check_ieee_8023_compliance_batch(pd.json_normalize(events[:4], sep="."))
+    assert len(batch) == 4
+    rows = check_ieee_8023_compliance_events(events)
+    assert len(rows) == len(events)
+
+    for event, row in zip(events, batch.to_dict(orient="records") + rows[4:]):
+        single = check_ieee_8023_compliance(event)
+        # Whole result, including the formatted cause/action/note text
+        assert row == single, (row, single)
+    assert rows[:4] == batch.to_dict(orient="records")
+    assert "High ONU temperature (78°C)." in rows[4]["probable_causes"]
+
+    print("  ✓ Batch compliance: OK")
+
+
+def test_vendor_hints():
+    """Test deterministic vendor hint classification."""
+    print("\nTesting Vendor Hint Classification...")
+
+    result = classify_vendor_hints("Huawei MA5800 ONU LOS alarm 0x45")
+    print(f"  Hints: {result['hints']}")
+    assert result["hints"] == [
+        "alarm:los", "code:hex", "model:huawei_ma5800", "vendor:huawei"
+    ]
+    assert result["vendor_specific"] is True
+
+    # Generic EPON alarms alone do not call for a vendor search
+    result = classify_vendor_hints("Rogue ONU detected after dying gasp")
+    assert result["hints"] == ["alarm:dying_gasp", "alarm:rogue_onu"]
+    assert result["vendor_specific"] is False
+
+    result = classify_vendor_hints("No abnormal conditions detected.")
+    assert result == {"hints": [], "vendor_specific": False}
+
+    print("  ✓ Vendor hints: OK")
+
+
+def test_event_logs_isolated_per_request():
+    """Test that concurrent requests on one event loop keep separate logs."""
+    print("\nTesting Per-Request Event Log Isolation...")
+
+    def text_event(author, text):
+        return SimpleNamespace(
+            author=author,
+            timestamp=0.0,
+            get_function_calls=lambda: [],
+            get_function_responses=lambda: [],
+            content=SimpleNamespace(parts=[SimpleNamespace(text=text)]),
+        )
+
+    async def request(name):
+        token = init_logs()
+        for i in range(3):
+            log_adk_event(text_event(name, f"{name}-{i}"))
+            await asyncio.sleep(0)  # let the other request interleave
+        logs = get_logs()
+        reset_logs(token)
+        assert get_logs() == []
+        return logs
+
+    async def main():
+        return await asyncio.gather(request("a"), request("b"))
+
+    logs_a, logs_b = asyncio.run(main())
+    assert [e["content"] for e in logs_a] == ["a-0", "a-1", "a-2"]
+    assert [e["content"] for e in logs_b] == ["b-0", "b-1", "b-2"]
+
+    # Outside a request nothing is recorded
+    log_adk_event(text_event("x", "dropped"))
+    assert get_logs() == []
+
+    print("  ✓ Event log isolation: OK")
+
+
+def _onu_record(onu_id, rx_power):
+    return (
+        '<notification xmlns="urn:ietf:params:xml:ns:netconf:notification:1.0">\n'
+        "  <eventTime>2025-11-24T10:00:00.000+00:00</eventTime>\n"
+        '  <onu-telemetry xmlns="urn:vendor:epon:telemetry">\n'
+        f"    <olt-id>OLT-01</olt-id><onu-id>{onu_id}</onu-id>\n"
+        f"    <rx-power>{rx_power}</rx-power>\n"
+        "  </onu-telemetry>\n"
+        "</notification>"
+    )
+
+
+def test_failed_onu_parse_keeps_cached_entry():
+    """Test that an ONU whose agent run fails keeps its cache entry and is retried."""
+    print("\nTesting Cache Worker Partial Parse Failure...")
+    worker = telemetry_cache_worker
+    records = [_onu_record("1", -23.5), _onu_record("2", -29.5)]
+    parsed_onus = []
+
+    async def fake_parse(runner, session_service, raw_log):
+        onu_id = "2" if "<onu-id>2</onu-id>" in raw_log else "1"
+        parsed_onus.append(onu_id)
+        if onu_id == "2":
+            raise RuntimeError("agent run failed")
+        return {"1": [{"onu_id": "1", "new": True}]}
+
+    names = ("_parse_with_agent", "_get_parse_runner", "get_latest_netconf_records",
+             "_stat_netconf_log", "save_cache_to_file", "_global_parsed_cache",
+             "_last_batch_hashes", "_failed_onus", "_last_processed_record_hash",
+             "_last_log_stat")
+    saved = {name: getattr(worker, name) for name in names}
+    worker._parse_with_agent = fake_parse
+    worker._get_parse_runner = lambda: (None, None)
+    worker.get_latest_netconf_records = lambda count, onu_id: records
+    worker._stat_netconf_log = lambda: (1, 1)
+    worker.save_cache_to_file = worker._set_global_cache
+    worker._global_parsed_cache = {"1": [{"onu_id": "1"}], "2": [{"onu_id": "2"}]}
+    worker._last_batch_hashes = {}
+    worker._last_processed_record_hash = None
+    worker._last_log_stat = None
+    try:
+        asyncio.run(worker.refresh_cache())
+        result = worker.get_global_cache()
+        assert result["1"] == [{"onu_id": "1", "new": True}]
+        assert result["2"] == [{"onu_id": "2"}]
+        # Only the ONU that parsed is fingerprinted
+        assert set(worker._last_batch_hashes) == {"1"}
+
+        # Same log, same records: the next update retries ONU 2 only
+        parsed_onus.clear()
+        asyncio.run(worker.refresh_cache())
+        assert parsed_onus == ["2"]
+        assert worker.get_global_cache()["2"] == [{"onu_id": "2"}]
+    finally:
+        for name, value in saved.items():
+            setattr(worker, name, value)
+
+    print("  ✓ Partial parse failure: OK")
+
+
+def _use_temp_log(log_path):
+    """Point netconf_log at `log_path`; returns the previous LOG_FILE."""
+    previous = netconf_log.LOG_FILE
+    netconf_log.LOG_FILE = log_path
+    # Cached results are keyed by the file's stat, not its path
+    netconf_log._records_cache.clear()
+    return previous
+
+
+def test_tail_read_matches_full_parse():
+    """Test that the growing tail window returns the same records as a full read."""
+    print("\nTesting Tail-Window Record Reads...")
+
+    # Records far longer than the initial window guess, so it has to grow,
+    # and the window start lands inside a record
+    padding = "<!-- " + "x" * 5000 + " -->"
+    records = [
+        _onu_record(str(i % 3 + 1), -20.0 - i).replace("</onu-telemetry>",
+                                                       padding + "</onu-telemetry>")
+        for i in range(12)
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = Path(tmp) / "telemetry.log"
+        log_path.write_text("\n\n".join(records) + "\n\n")
+        previous = _use_temp_log(log_path)
+        try:
+            for count in (1, 3, 5, 50):
+                assert netconf_log.get_latest_netconf_records(count=count) == records[-count:]
+                for onu_id in ("1", "2"):
+                    expected = [r for r in records
+                                if f"<onu-id>{onu_id}</onu-id>" in r][-count:]
+                    assert netconf_log.get_latest_netconf_records(
+                        count=count, onu_id=onu_id) == expected, (count, onu_id)
+        finally:
+            _use_temp_log(previous)
+
+    print("  ✓ Tail-window reads: OK")
+
+
+def test_record_cache_sees_appends():
+    """Test that appending to the log invalidates the cached record reads."""
+    print("\nTesting Record Cache Invalidation...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = Path(tmp) / "telemetry.log"
+        log_path.write_text(_onu_record("1", -23.5) + "\n\n")
+        previous = _use_temp_log(log_path)
+        try:
+            before = netconf_log.get_latest_netconf_records(count=10)
+            assert len(before) == 1
+            # Served from the cache while the file is unchanged
+            assert netconf_log.get_latest_netconf_records(count=10) == before
+
+            netconf_log._inject_signal(7, netconf_log._DEGRADED_SIGNAL)
+            after = netconf_log.get_latest_netconf_records(count=10)
+            assert len(after) == 2
+            assert after[0] == before[0]
+            assert "<onu-id>7</onu-id>" in after[-1]
+            assert netconf_log.get_single_netconf_record("7") == after[-1]
+        finally:
+            _use_temp_log(previous)
+
+    print("  ✓ Record cache invalidation: OK")
+
+
+def test_log_rotation_keeps_whole_records():
+    """Test that size-based rotation keeps whole records and appends continue."""
+    print("\nTesting Telemetry Log Rotation...")
+    gen = netconf_generator
+    saved = (gen.LOG_FILE, gen.MAX_LOG_BYTES, gen.ROTATE_KEEP_BYTES)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = Path(tmp) / "telemetry.log"
+        gen._close_log_fp()
+        gen.LOG_FILE = log_path
+        gen.MAX_LOG_BYTES = 4000
+        gen.ROTATE_KEEP_BYTES = 2000
+        previous = _use_temp_log(log_path)
+        try:
+            metrics = gen.generate_all_onu_metrics()[0]
+            rotations = 0
+            last_size = 0
+            for i in range(40):
+                ts = f"2025-11-24T10:00:{i:02d}.000+00:00"
+                gen.append_to_log(gen.build_netconf_notification_xml(ts, metrics))
+
+                data = log_path.read_bytes()
+                if len(data) < last_size:
+                    rotations += 1
+                    # The kept tail starts on a record boundary
+                    assert data.startswith(b"<notification"), data[:40]
+                last_size = len(data)
+                assert len(data) <= gen.MAX_LOG_BYTES
+
+                # Every kept record parses, and the newest one is this write
+                # (the append handle was reopened on the new file)
+                records = netconf_log.get_latest_netconf_records(count=0)
+                assert records
+                for record in records:
+                    parse_telemetry_log(record)
+                assert f"<eventTime>{ts}</eventTime>" in records[-1]
+
+            assert rotations >= 2
+        finally:
+            gen._close_log_fp()
+            gen.LOG_FILE, gen.MAX_LOG_BYTES, gen.ROTATE_KEEP_BYTES = saved
+            _use_temp_log(previous)
+
+    print("  ✓ Log rotation: OK")
+
+
 if __name__ == "__main__":
     try:
         test_parsing()
+        test_parsing_prefixed_tags()
         test_compliance_normal()
         test_compliance_degraded()
+        test_compliance_batch_matches_single()
+        test_vendor_hints()
+        test_event_logs_isolated_per_request()
+        test_failed_onu_parse_keeps_cached_entry()
+        test_tail_read_matches_full_parse()
+        test_record_cache_sees_appends()
+        test_log_rotation_keeps_whole_records()
         print("\n✅ ALL TESTS PASSED")
     except AssertionError as e:
         print(f"\n❌ TEST FAILED: {e}")
@@ -1,28 +1,51 @@
-from contextvars import ContextVar
-from typing import List, Dict, Any
+from contextvars import ContextVar, Token
+from typing import List, Dict, Any, Optional
 from datetime import datetime
 
+# Shared "not logging" sentinel: the context default until init_logs() runs.
+# Never appended to - log_adk_event returns as soon as it sees it.
+_NOOP: List[Dict[str, Any]] = []
+
 # Context variable to hold the logs for the current request
-# We initialize it with None, and set it to a new list at the start of each request
-_request_logs: ContextVar[List[Dict[str, Any]]] = ContextVar('request_logs', default=None)
+# Each request sets it to a new list at the start; outside a request it is _NOOP
+_request_logs: ContextVar[List[Dict[str, Any]]] = ContextVar('request_logs', default=_NOOP)
+
+def init_logs() -> Token:
+    """
+    Initialize a new log list for the current context.
 
-def init_logs():
-    """Initialize a new log list for the current context."""
-    _request_logs.set([])
+    Returns a token for reset_logs(), which ends logging for the request.
+    """
+    return _request_logs.set([])
+
+def reset_logs(token: Token) -> None:
+    """Restore the context's log list to what it was before init_logs()."""
+    try:
+        _request_logs.reset(token)
+    except ValueError:
+        # Finalized from another context (e.g. a stream closed elsewhere);
+        # that context never saw this request's list
+        pass
 
 def get_logs() -> List[Dict[str, Any]]:
     """Get the logs for the current context."""
     logs = _request_logs.get()
-    if logs is None:
+    if logs is _NOOP:
         return []
     return logs
 
 def log_adk_event(event):
     """Log an ADK event to the current context."""
     logs = _request_logs.get()
-    if logs is None:
+    if logs is _NOOP:
         return
 
+    log_entry = _format_event(event)
+    if log_entry is not None:
+        logs.append(log_entry)
+
+def _format_event(event) -> Optional[Dict[str, Any]]:
+    """Build the log entry for an ADK event, or None if there is nothing to log."""
     # Logic extracted from app.py to format the event
     log_entry = {
         "author": event.author,
@@ -39,8 +62,7 @@ def log_adk_event(event):
         for fc in func_calls:
             calls.append(f"{fc.name}({fc.args})")
         log_entry["content"] = "; ".join(calls)
-        logs.append(log_entry)
-        return
+        return log_entry
 
     # Check for function responses
     func_resps = event.get_function_responses()
@@ -50,8 +72,7 @@ def log_adk_event(event):
         for fr in func_resps:
             resps.append(f"Result from {fr.name}")
         log_entry["content"] = "; ".join(resps)
-        logs.append(log_entry)
-        return
+        return log_entry
 
     # Regular text content
     if event.content and event.content.parts:
@@ -62,4 +83,36 @@ def log_adk_event(event):
         
         if text_parts:
             log_entry["content"] = "\n".join(text_parts)
-            logs.append(log_entry)
+            return log_entry
+
+    return None
+
+class EventLogBuffer:
+    """
+    Batches log_adk_event for one event stream: entries are held locally and
+    added to the current context's log in bulk, every FLUSH_SIZE events and
+    on flush().
+    """
+
+    FLUSH_SIZE = 64
+
+    def __init__(self):
+        # The request's log list (or _NOOP), looked up once for the stream
+        self._logs = _request_logs.get()
+        self._pending: List[Dict[str, Any]] = []
+
+    def append(self, event):
+        """Queue an ADK event for the log."""
+        if self._logs is _NOOP:
+            return
+        log_entry = _format_event(event)
+        if log_entry is not None:
+            self._pending.append(log_entry)
+            if len(self._pending) >= self.FLUSH_SIZE:
+                self.flush()
+
+    def flush(self):
+        """Add all queued entries to the log."""
+        if self._pending:
+            self._logs.extend(self._pending)
+            self._pending.clear()
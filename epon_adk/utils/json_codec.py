@@ -0,0 +1,35 @@
+"""JSON encode/decode helpers that use orjson when it is installed."""
+
+import json
+from typing import Any, Callable, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib
+    orjson = None
+
+
+def dumps(obj: Any, default: Optional[Callable[[Any], Any]] = None, indent: bool = False) -> str:
+    """
+    Serialize `obj` to a JSON string, optionally indented by two spaces.
+    `default` converts objects the encoder does not support natively.
+    """
+    if orjson is not None:
+        return orjson.dumps(
+            obj, default=default, option=orjson.OPT_INDENT_2 if indent else 0
+        ).decode()
+    return json.dumps(obj, default=default, indent=2 if indent else None)
+
+
+def dumps_bytes(obj: Any, indent: bool = False) -> bytes:
+    """Serialize `obj` to UTF-8 JSON bytes, optionally indented by two spaces."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(obj, indent=2 if indent else None).encode("utf-8")
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Deserialize a JSON document (str or bytes)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -1,18 +1,126 @@
-from typing import Any
+from contextvars import ContextVar
+from typing import Any, Optional
 from typing_extensions import override
 
+from google.adk.agents.llm_agent import LlmAgent
+from google.adk.artifacts.base_artifact_service import BaseArtifactService
+from google.adk.memory.in_memory_memory_service import InMemoryMemoryService
+from google.adk.runners import Runner
+from google.adk.sessions.in_memory_session_service import InMemorySessionService
+from google.adk.tools._forwarding_artifact_service import ForwardingArtifactService
 from google.adk.tools.agent_tool import AgentTool
 from google.adk.tools import ToolContext
 from google.genai import types
 from google.adk.utils.context_utils import Aclosing
 
-from epon_adk.utils.event_logger import log_adk_event
+from epon_adk.utils.event_logger import EventLogBuffer
+
+# Artifact service of the sub-agent call running in the current context
+_call_artifact_service: ContextVar[Optional[BaseArtifactService]] = ContextVar(
+    'call_artifact_service', default=None
+)
+
+class _CallArtifactService(BaseArtifactService):
+    """
+    Artifact service for pooled sub-agent Runners. A Runner outlives the tool
+    call that needs its artifacts forwarded, so every method is delegated to
+    the current call's ForwardingArtifactService, found via a ContextVar
+    (concurrent calls run in separate contexts).
+    """
+
+    @override
+    async def save_artifact(self, **kwargs):
+        return await _call_artifact_service.get().save_artifact(**kwargs)
+
+    @override
+    async def load_artifact(self, **kwargs):
+        return await _call_artifact_service.get().load_artifact(**kwargs)
+
+    @override
+    async def list_artifact_keys(self, **kwargs):
+        return await _call_artifact_service.get().list_artifact_keys(**kwargs)
+
+    @override
+    async def delete_artifact(self, **kwargs):
+        return await _call_artifact_service.get().delete_artifact(**kwargs)
+
+    @override
+    async def list_versions(self, **kwargs):
+        return await _call_artifact_service.get().list_versions(**kwargs)
+
+    @override
+    async def list_artifact_versions(self, **kwargs):
+        return await _call_artifact_service.get().list_artifact_versions(**kwargs)
+
+    @override
+    async def get_artifact_version(self, **kwargs):
+        return await _call_artifact_service.get().get_artifact_version(**kwargs)
 
 class LoggingAgentTool(AgentTool):
     """
     A subclass of AgentTool that logs events to the shared event logger.
     """
 
+    # Session and memory services for the sub-agent, created on first use and
+    # shared by every call of this tool; each call still gets its own session
+    _session_service = None
+    _memory_service = None
+    # Builds the sub-agent's message from the call args; picked on first use
+    _build_content = None
+    # Runners for the sub-agent, keyed by everything a Runner is built from
+    # besides the per-call artifact service (see _runner_for)
+    _runners = None
+
+    def _runner_for(self, app_name, credential_service, plugins) -> Runner:
+        """Return the pooled Runner for this app name, credentials and plugins."""
+        # The Runner references the credential service and plugins, so their
+        # ids stay valid for as long as the pooled entry exists
+        key = (app_name, id(credential_service), tuple(map(id, plugins)))
+        if self._runners is None:
+            self._runners = {}
+        runner = self._runners.get(key)
+        if runner is None:
+            if self._session_service is None:
+                self._session_service = InMemorySessionService()
+                self._memory_service = InMemoryMemoryService()
+            runner = self._runners[key] = Runner(
+                app_name=app_name,
+                agent=self.agent,
+                artifact_service=_CallArtifactService(),
+                session_service=self._session_service,
+                memory_service=self._memory_service,
+                credential_service=credential_service,
+                # No defensive copy: the child Runner's PluginManager registers
+                # the plugins into a list of its own
+                plugins=plugins,
+            )
+        return runner
+
+    def _content_builder(self):
+        """Return the args -> Content builder for this agent's input schema."""
+        if isinstance(self.agent, LlmAgent) and self.agent.input_schema:
+            input_schema = self.agent.input_schema
+
+            def build(args: dict[str, Any]) -> types.Content:
+                input_value = input_schema.model_validate(args)
+                return types.Content(
+                    role='user',
+                    parts=[
+                        types.Part(
+                            text=input_value.model_dump_json(exclude_none=True)
+                        )
+                    ],
+                )
+        else:
+
+            def build(args: dict[str, Any]) -> types.Content:
+                return types.Content(
+                    role='user',
+                    parts=[types.Part(text=args['request'])],
+                )
+
+        return build
+
     @override
     async def run_async(
         self,
@@ -20,76 +128,89 @@ class LoggingAgentTool(AgentTool):
         args: dict[str, Any],
         tool_context: ToolContext,
     ) -> Any:
-        from google.adk.agents.llm_agent import LlmAgent
-        from google.adk.runners import Runner
-        from google.adk.sessions.in_memory_session_service import InMemorySessionService
-        from google.adk.memory.in_memory_memory_service import InMemoryMemoryService
-        from google.adk.tools._forwarding_artifact_service import ForwardingArtifactService
-
         if self.skip_summarization:
             tool_context.actions.skip_summarization = True
 
-        if isinstance(self.agent, LlmAgent) and self.agent.input_schema:
-            input_value = self.agent.input_schema.model_validate(args)
-            content = types.Content(
-                role='user',
-                parts=[
-                    types.Part.from_text(
-                        text=input_value.model_dump_json(exclude_none=True)
-                    )
-                ],
-            )
-        else:
-            content = types.Content(
-                role='user',
-                parts=[types.Part.from_text(text=args['request'])],
-            )
+        # The schema check is fixed for the agent, so it is made only once
+        build_content = self._build_content
+        if build_content is None:
+            build_content = self._build_content = self._content_builder()
+        content = build_content(args)
+
+        # Bound once; everything below reads from these locals
         invocation_context = tool_context._invocation_context
-        parent_app_name = (
-            invocation_context.app_name if invocation_context else None
-        )
-        child_app_name = parent_app_name or self.agent.name
-        runner = Runner(
-            app_name=child_app_name,
-            agent=self.agent,
-            artifact_service=ForwardingArtifactService(tool_context),
-            session_service=InMemorySessionService(),
-            memory_service=InMemoryMemoryService(),
-            credential_service=tool_context._invocation_context.credential_service,
-            plugins=list(tool_context._invocation_context.plugin_manager.plugins),
-        )
+        user_id = invocation_context.user_id
+        credential_service = invocation_context.credential_service
+        plugins = invocation_context.plugin_manager.plugins
+        parent_state = tool_context.state
+
+        child_app_name = invocation_context.app_name or self.agent.name
+        runner = self._runner_for(child_app_name, credential_service, plugins)
 
-        state_dict = {
-            k: v
-            for k, v in tool_context.state.to_dict().items()
-            if not k.startswith('_adk')  # Filter out adk internal states
-        }
+        # to_dict() already returns a fresh merged copy, so filter out adk
+        # internal states in place instead of building a second dict
+        state_dict = parent_state.to_dict()
+        for key in [k for k in state_dict if k.startswith('_adk')]:
+            del state_dict[key]
         session = await runner.session_service.create_session(
             app_name=child_app_name,
-            user_id=tool_context._invocation_context.user_id,
+            user_id=user_id,
             state=state_dict,
         )
 
         last_content = None
-        async with Aclosing(
-            runner.run_async(
-                user_id=session.user_id, session_id=session.id, new_message=content
+        # Sub-agent events only reach the client once this tool returns, so
+        # they are logged in batches rather than one append per event
+        log_buffer = EventLogBuffer()
+        # State deltas for the parent session, merged across the stream. The
+        # sub-agent runs on its own session copy, so the parent only needs
+        # the end result
+        merged_delta = {}
+        # Bound above the loop; the body runs once per streamed event
+        log_event = log_buffer.append
+        merge_delta = merged_delta.update
+        # Artifacts of this call go to the parent tool context
+        artifacts_token = _call_artifact_service.set(
+            ForwardingArtifactService(tool_context)
+        )
+        try:
+            async with Aclosing(
+                runner.run_async(
+                    user_id=user_id, session_id=session.id, new_message=content
+                )
+            ) as agen:
+                async for event in agen:
+                    # --- LOGGING INJECTION ---
+                    log_event(event)
+                    # -------------------------
+
+                    # Collect state delta for the parent session.
+                    actions = event.actions
+                    delta = actions.state_delta if actions else None
+                    if delta:
+                        merge_delta(delta)
+                    event_content = event.content
+                    if event_content:
+                        last_content = event_content
+        finally:
+            _call_artifact_service.reset(artifacts_token)
+            # Forward state delta to parent session (also after a failed
+            # run, as far as it got)
+            if merged_delta:
+                parent_state.update(merged_delta)
+            log_buffer.flush()
+            # The session service outlives this call; drop the finished session
+            await self._session_service.delete_session(
+                app_name=child_app_name,
+                user_id=user_id,
+                session_id=session.id,
             )
-        ) as agen:
-            async for event in agen:
-                # --- LOGGING INJECTION ---
-                log_adk_event(event)
-                # -------------------------
-
-                # Forward state delta to parent session.
-                if event.actions.state_delta:
-                    tool_context.state.update(event.actions.state_delta)
-                if event.content:
-                    last_content = event.content
-
-        if not last_content:
+
+        if not last_content or not last_content.parts:
             return ''
-        merged_text = '\n'.join(p.text for p in last_content.parts if p.text)
+        # Only the final content is the tool's answer; earlier events' text is
+        # intermediate. join() materializes its input anyway, so hand it a list
+        merged_text = '\n'.join([p.text for p in last_content.parts if p.text])
         if isinstance(self.agent, LlmAgent) and self.agent.output_schema:
             tool_result = self.agent.output_schema.model_validate_json(
                 merged_text
@@ -1,7 +1,12 @@
 import asyncio
+import atexit
+import logging
+import logging.handlers
 import os
+import queue
 import uuid
-from flask import Flask, render_template, request, jsonify, session
+from quart import Quart, Response, render_template, request, jsonify, session
+from quart.json.provider import DefaultJSONProvider
 from google.adk.runners import Runner
 from google.adk.sessions import InMemorySessionService
 from google.genai import types
@@ -17,10 +22,54 @@ sys.path.append(str(Path(__file__).parent.parent))
 
 from epon_adk.agents.root_agent import root_agent
 from epon_adk.db import netconf_log
-from epon_adk.utils.event_logger import init_logs, get_logs, log_adk_event
+from epon_adk.utils.event_logger import init_logs, reset_logs, get_logs, log_adk_event
 from epon_adk.background import start_background_worker, get_global_cache
+from epon_adk.utils import json_codec
 
-app = Flask(__name__)
+class CodecJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider for jsonify/get_json that goes through json_codec, so
+    responses are encoded with orjson when it is installed. Anything the
+    codec rejects (e.g. non-string dict keys) falls back to the default.
+    """
+
+    @staticmethod
+    def _default(o):
+        if hasattr(o, "model_dump"):  # pydantic models, e.g. genai types
+            return o.model_dump(mode="json", exclude_none=True)
+        return DefaultJSONProvider.default(o)
+
+    def dumps(self, obj, **kwargs):
+        if kwargs.keys() - {"indent", "separators"}:
+            return super().dumps(obj, **kwargs)
+        try:
+            return json_codec.dumps(obj, default=self._default, indent=bool(kwargs.get("indent")))
+        except TypeError:
+            return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return json_codec.loads(s)
+
+# App diagnostics go through a QueueHandler; a listener thread does the
+# actual stderr writes, so request handlers never block on the stream.
+# Informational messages are hidden unless WEB_LOG_LEVEL is lowered; an
+# unknown level name falls back to WARNING rather than failing the import
+log = logging.getLogger(__name__)
+_log_level = os.environ.get('WEB_LOG_LEVEL', 'WARNING').upper()
+if not isinstance(logging.getLevelName(_log_level), int):
+    _log_level = 'WARNING'
+log.setLevel(_log_level)
+log.propagate = False
+_log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+log.addHandler(logging.handlers.QueueHandler(_log_queue))
+_log_listener = logging.handlers.QueueListener(_log_queue, logging.StreamHandler())
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+app = Quart(__name__)
+app.json = CodecJSONProvider(app)
 app.secret_key = os.environ.get('FLASK_SECRET_KEY', 'dev-secret-key-change-in-production')
 
 APP_NAME = "epon_web_app"
@@ -29,112 +78,184 @@ USER_ID = "web_user"
 # Background cache worker
 CACHE_UPDATE_INTERVAL = int(os.environ.get('CACHE_UPDATE_INTERVAL', '60'))  # seconds
 
-# Global runner and session service
-runner = None
-session_service = None
+# Global runner and session service, built once at import (both constructors
+# are synchronous), so requests never race to create them
+session_service = InMemorySessionService()
+runner = Runner(
+    app_name=APP_NAME,
+    agent=root_agent,
+    session_service=session_service,
+)
+log.info("Runner initialized.")
 
-async def init_runner():
-    global runner, session_service
-    session_service = InMemorySessionService()
-    runner = Runner(
+cache_worker = None
+
+# Sessions created ahead of time for new browser clients, so their first
+# /chat does not wait on create_session; refilled by a background task
+SESSION_POOL_SIZE = 16
+_session_pool: "asyncio.Queue[str]" = asyncio.Queue(maxsize=SESSION_POOL_SIZE)
+_session_pool_filler = None
+
+async def _create_session() -> str:
+    """Create a new agent session and return its ID."""
+    session_id = str(uuid.uuid4())
+    await session_service.create_session(
         app_name=APP_NAME,
-        agent=root_agent,
-        session_service=session_service,
+        user_id=USER_ID,
+        session_id=session_id,
     )
-    print("Runner initialized.")
+    return session_id
 
-# Start background cache worker on app startup
-print(f"🚀 Starting background telemetry cache worker (interval: {CACHE_UPDATE_INTERVAL}s)...")
-cache_worker_thread = start_background_worker(interval_seconds=CACHE_UPDATE_INTERVAL)
+async def _fill_session_pool():
+    """Keep the session pool full; put() waits while it is."""
+    while True:
+        await _session_pool.put(await _create_session())
+
+async def _new_session_id() -> str:
+    """Take a pre-created session, or create one if the pool is drained."""
+    try:
+        return _session_pool.get_nowait()
+    except asyncio.QueueEmpty:
+        return await _create_session()
+
+@app.before_serving
+async def start_cache_worker():
+    """Start the background cache worker as a task on the server's event loop."""
+    global cache_worker
+    log.info("🚀 Starting background telemetry cache worker (interval: %ss)...", CACHE_UPDATE_INTERVAL)
+    cache_worker = start_background_worker(interval_seconds=CACHE_UPDATE_INTERVAL)
+
+@app.before_serving
+async def start_session_pool():
+    global _session_pool_filler
+    _session_pool_filler = asyncio.create_task(_fill_session_pool())
+
+@app.after_serving
+async def stop_cache_worker():
+    if isinstance(cache_worker, asyncio.Task):
+        cache_worker.cancel()
+    if _session_pool_filler is not None:
+        _session_pool_filler.cancel()
 
 
 @app.before_request
 async def startup():
     pass
 
+# Rendered landing page; the template only depends on the static URL, so it
+# is rendered on the first request (url_for needs one) and reused after
+_index_html = None
+
 @app.route("/")
-def index():
-    return render_template("index.html")
+async def index():
+    global _index_html
+    if _index_html is None or app.debug:
+        _index_html = await render_template("index.html")
+    return _index_html
 
 @app.route("/chat", methods=["POST"])
 async def chat():
-    global runner, session_service
-    if runner is None:
-        await init_runner()
+    # Missing or malformed JSON is a plain 400, checked before any session work
+    data = await request.get_json(silent=True)
+    user_message = data.get("message") if isinstance(data, dict) else None
+
+    if not user_message:
+        return jsonify({"error": "No message provided"}), 400
 
     # Get or create session ID for this browser client
     if 'session_id' not in session:
-        session['session_id'] = str(uuid.uuid4())
-        # Create the session in the InMemorySessionService
-        await session_service.create_session(
-            app_name=APP_NAME,
-            user_id=USER_ID,
-            session_id=session['session_id'],
-        )
-        print(f"New session created: {session['session_id']}")
+        # Sessions in the InMemorySessionService are created ahead of time
+        session['session_id'] = await _new_session_id()
+        log.info("New session created: %s", session['session_id'])
     
     client_session_id = session['session_id']
 
-    # Initialize logs for this request context
-    init_logs()
-
-    data = request.json
-    user_message = data.get("message", "")
-
-    if not user_message:
-        return jsonify({"error": "No message provided"}), 400
-
     content = types.Content(
         role="user",
         parts=[types.Part(text=user_message)],
     )
 
-    response_text = ""
-    
-    try:
-        async for event in runner.run_async(
-            user_id=USER_ID,
-            session_id=client_session_id,
-            new_message=content,
-        ):
-            # Log root agent events
-            log_adk_event(event)
-
-            if event.is_final_response():
-                if event.content and event.content.parts:
-                     response_text = event.content.parts[0].text
-    except Exception as e:
-        print(f"Error during agent execution: {e}")
-        import traceback
-        traceback.print_exc()
-        return jsonify({"error": str(e)}), 500
-
-    # Retrieve all logs (root + sub-agents)
-    logs = get_logs()
-    return jsonify({"response": response_text, "logs": logs, "session_id": client_session_id})
+    async def stream_events():
+        # Initialize logs for this request context; reset when the stream
+        # ends so the list is not left attached to whatever task ran it
+        logs_token = init_logs()
+        logs = get_logs()
+        response_text = ""
+
+        try:
+            async for event in runner.run_async(
+                user_id=USER_ID,
+                session_id=client_session_id,
+                new_message=content,
+            ):
+                # Log root agent events
+                log_adk_event(event)
+
+                if event.is_final_response():
+                    if event.content and event.content.parts:
+                         response_text = event.content.parts[0].text
+
+                # Send what was logged so far (root + sub-agents) and drop it
+                pending = logs[:]
+                logs.clear()
+                for entry in pending:
+                    yield _sse("log", entry)
+        except Exception as e:
+            log.exception("Error during agent execution: %s", e)
+            yield _sse("error", {"error": str(e)})
+            return
+        finally:
+            reset_logs(logs_token)
+
+        yield _sse("done", {"response": response_text, "session_id": client_session_id})
+
+    response = Response(
+        stream_events(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    # Agent runs can outlast Quart's default response timeout
+    response.timeout = None
+    return response
+
+def _sse(event: str, data) -> bytes:
+    """Format one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json_codec.dumps(data)}\n\n".encode("utf-8")
+
+# Scenario name -> log injector for /inject
+INJECT_SCENARIOS = {
+    "degrade_onu": netconf_log.inject_degraded_signal,
+    "clear_issues": netconf_log.inject_normal_signal,
+    # For now, we'll reuse degraded signal as a proxy for network issues
+    "ddos_attack": netconf_log.inject_degraded_signal,
+}
 
 @app.route("/inject", methods=["POST"])
-def inject():
-    data = request.json
+async def inject():
+    data = await request.get_json(silent=True)
+    if not isinstance(data, dict):
+        data = {}
     scenario = data.get("scenario")
     onu_id = data.get("onu_id", 2)  # Default to ONU-2
     
     if not scenario:
         return jsonify({"error": "Missing scenario"}), 400
     
-    if scenario == "degrade_onu":
-        netconf_log.inject_degraded_signal(onu_id)
-    elif scenario == "clear_issues":
-        netconf_log.inject_normal_signal(onu_id)
-    elif scenario == "ddos_attack":
-        # For now, we'll reuse degraded signal as a proxy for network issues
-        netconf_log.inject_degraded_signal(onu_id)
-    else:
+    injector = INJECT_SCENARIOS.get(scenario)
+    if injector is None:
         return jsonify({"error": f"Unknown scenario: {scenario}"}), 400
     
+    # The injectors append to the log file; keep that I/O off the event loop
+    await asyncio.to_thread(injector, onu_id)
+    
     return jsonify({"status": "success", "scenario": scenario, "onu_id": onu_id})
 
 if __name__ == "__main__":
-    # In production we might use hypercorn/uvicorn, but for dev flask.run is fine.
-    # Flask 2.0+ supports async routes.
-    app.run(debug=True, port=8080)
+    # Served by Hypercorn so every request shares one event loop. Equivalent to:
+    #   hypercorn epon_adk.web.app:app --bind 127.0.0.1:8080
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config
+
+    config = Config()
+    config.bind = ["127.0.0.1:8080"]
+    asyncio.run(serve(app, config))